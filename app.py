@@ -1,25 +1,61 @@
 import streamlit as st
-import cv2
-import numpy as np
-import mediapipe as mp
-from PIL import Image
+import base64
+import logging
 import tempfile
 
+import instrumentation
+import vision
+from assessment_store import get_store
+from inference_service import ServiceBusy, get_service
+from multiview import CORONAL_METRICS, REQUIRED_LANDMARKS, combine_views, scoring_fields
+from report import generate_report
+from scoring import HIP_ANGLE_THRESHOLD, calculate_score, get_risk_level
+
+logger = logging.getLogger(__name__)
+
 def main():
     st.set_page_config(page_title="Posture and Scoliosis Assessment Tool", layout="wide")
     st.title("🧍‍♂️ Posture and Scoliosis Assessment Tool")
     st.write("Welcome! This tool will help assess your posture and identify potential issues related to scoliosis.")
 
-    if 'score' not in st.session_state:
-        st.session_state.score = 0
-    if 'responses' not in st.session_state:
-        st.session_state.responses = {}
+    # Metrics endpoint (if configured) and the opt-in per-run debug panel
+    instrumentation.start_metrics_server()
+    show_debug_panel = st.sidebar.checkbox("Show performance debug panel")
+    trace = instrumentation.start_trace() if show_debug_panel else None
+
+    # Answers only reach the server on submit, so filling in the form never reruns the script
+    with st.form("assessment_form"):
+        responses, uploaded_files = ask_questions()
+        submitted = st.form_submit_button("Submit Assessment")
+
+    # Results are kept in session state, so later reruns (download, monitoring) redraw them without recomputing
+    assessment = st.session_state.get("assessment")
+    if submitted:
+        assessment = submit_assessment(responses, uploaded_files)
+    if assessment is not None:
+        show_results(assessment)
+
+    st.markdown("---")
+
+    show_monitoring()
+
+    st.markdown("---")
+    st.warning(
+        "**Disclaimer:** This tool provides general information and is not a substitute for professional medical diagnosis or treatment. If you suspect you have scoliosis or any serious posture-related issues, please consult a healthcare professional."
+    )
 
-    def reset_assessment():
-        st.session_state.score = 0
-        st.session_state.responses = {}
-        st.experimental_rerun()
+    if trace is not None:
+        show_performance_panel(trace)
+    instrumentation.write_prometheus()
 
+    # The page is out; load the pose models in the background for the first upload
+    if vision.WARM_UP:
+        vision.start_warm_up()
+
+def reset_assessment():
+    st.session_state.assessment = None
+
+def ask_questions():
     # Collect demographic information
     st.header("1. Demographic Information")
     age = st.number_input("What is your age?", min_value=5, max_value=100, value=20, step=1)
@@ -34,12 +70,12 @@ def main():
     st.header("2. Symptom Assessment")
     pain_present = st.radio("Do you experience any pain in your back or neck?", ("Yes", "No"), key='pain_present')
 
-    if pain_present == "Yes":
-        pain_location = st.multiselect("Where do you primarily feel the pain?", ["Upper Back", "Lower Back", "Neck", "Shoulders", "Other"])
-        pain_severity = st.slider("On a scale of 1 to 10, how would you rate your pain?", 1, 10, 5)
-        pain_duration = st.selectbox("How long have you been experiencing this pain?", ["Less than a month", "1-6 months", "6 months to a year", "Over a year"])
-        symptom_onset = st.radio("Did your pain start gradually or suddenly?", ("Gradually", "Suddenly"))
-        activity_related_pain = st.radio("Does physical activity worsen your pain?", ("Yes", "No"))
+    st.caption("If you experience pain:")
+    pain_location = st.multiselect("Where do you primarily feel the pain?", ["Upper Back", "Lower Back", "Neck", "Shoulders", "Other"])
+    pain_severity = st.slider("On a scale of 1 to 10, how would you rate your pain?", 1, 10, 5)
+    pain_duration = st.selectbox("How long have you been experiencing this pain?", ["Less than a month", "1-6 months", "6 months to a year", "Over a year"])
+    symptom_onset = st.radio("Did your pain start gradually or suddenly?", ("Gradually", "Suddenly"))
+    activity_related_pain = st.radio("Does physical activity worsen your pain?", ("Yes", "No"))
 
     st.markdown("---")
 
@@ -81,334 +117,307 @@ def main():
 
     st.markdown("---")
 
-    # Image upload and analysis
+    # Image upload; the photos are analyzed together when the assessment is submitted
     st.header("7. Image Upload and Analysis")
-    st.write("You can upload a **side view** image of your body to analyze your posture.")
-
-    uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png"])
-
-    if uploaded_file is not None:
-        # Read the uploaded image
-        image = Image.open(uploaded_file)
-        # Convert the image to RGB
-        image = image.convert('RGB')
-        # Convert to numpy array
-        image_np = np.array(image)
-
-        # Display the uploaded image
-        st.image(image_np, caption='Uploaded Image',  width=400)
-
-        # Process the image and analyze posture
-        with st.spinner('Analyzing image...'):
-            # Initialize Mediapipe
-            mp_drawing = mp.solutions.drawing_utils
-            mp_pose = mp.solutions.pose
-
-            # Convert the image to RGB for Mediapipe
-            image_rgb = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-
-            # Perform pose estimation
-            with mp_pose.Pose(static_image_mode=True, model_complexity=2, enable_segmentation=False) as pose:
-                results = pose.process(image_rgb)
-
-                if results.pose_landmarks:
-                    # Draw pose landmarks on the image
-                    annotated_image = image_np.copy()
-                    mp_drawing.draw_landmarks(
-                        annotated_image, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-
-                    # Display the annotated image
-                    st.image(annotated_image, caption='Analyzed Image',  width=400)
-
-                    # Calculate angles
-                    # For side view, relevant landmarks could be:
-                    # - Shoulder (left/right)
-                    # - Hip (left/right)
-                    # - Knee (left/right)
-                    # Since it's a side view, one side of the body may be more visible.
-
-                    # Get landmark coordinates
-                    landmarks = results.pose_landmarks.landmark
-
-                    # Define function to get coordinates
-                    def get_landmark_coords(landmark):
-                        return [landmark.x, landmark.y]
-
-                    # Choose left side landmarks for side view analysis
-                    shoulder = get_landmark_coords(landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER])
-                    hip = get_landmark_coords(landmarks[mp_pose.PoseLandmark.LEFT_HIP])
-                    knee = get_landmark_coords(landmarks[mp_pose.PoseLandmark.LEFT_KNEE])
-
-                    # Calculate angle at hip
-                    def calculate_angle(a, b, c):
-                        a = np.array(a)  # First point
-                        b = np.array(b)  # Middle point
-                        c = np.array(c)  # End point
-
-                        radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-                        angle = np.abs(radians*180.0/np.pi)
-
-                        if angle > 180.0:
-                            angle = 360 - angle
-
-                        return angle
-
-                    hip_angle = calculate_angle(shoulder, hip, knee)
-
-                    st.write(f"**Hip Angle:** {hip_angle:.2f} degrees")
-
-                    # Analyze hip angle
-                    if hip_angle < 165:
-                        st.write("🔴 **Your hip angle indicates a possible issue with posture.**")
-                        st.session_state.score += 2  # Add to the score
-                    else:
-                        st.write("🟢 **Your hip angle is within a normal range.**")
-
+    st.write("You can upload a **side view** image of your body to analyze your posture, and optionally **front** and **back** views to check whether your shoulders, hips and head are level. They are analyzed when you submit the assessment.")
+    upload_columns = st.columns(3)
+    uploaded_files = {
+        "side": upload_columns[0].file_uploader("Side view (hip angle)", type=["jpg", "jpeg", "png"]),
+        "front": upload_columns[1].file_uploader("Front view (optional)", type=["jpg", "jpeg", "png"]),
+        "back": upload_columns[2].file_uploader("Back view (optional)", type=["jpg", "jpeg", "png"]),
+    }
+
+    # Answers to the pain follow-ups only count when pain is present
+    responses = {
+        "age": age,
+        "gender": gender,
+        "height": height,
+        "weight": weight,
+        "occupation": occupation,
+        "pain_present": pain_present,
+        "pain_location": pain_location if pain_present == "Yes" else [],
+        "pain_severity": pain_severity if pain_present == "Yes" else 0,
+        "pain_duration": pain_duration if pain_present == "Yes" else "",
+        "symptom_onset": symptom_onset if pain_present == "Yes" else "",
+        "activity_related_pain": activity_related_pain if pain_present == "Yes" else "",
+        "previous_diagnosis": previous_diagnosis,
+        "family_history": family_history,
+        "past_injuries": past_injuries,
+        "physical_activity_level": physical_activity_level,
+        "screen_time": screen_time,
+        "posture_awareness": posture_awareness,
+        "ergonomic_setup": ergonomic_setup,
+        "sleeping_position": sleeping_position,
+        "shoulder_alignment": shoulder_alignment,
+        "head_alignment": head_alignment,
+        "spinal_curvature": spinal_curvature,
+        "hip_level": hip_level,
+        "foot_alignment": foot_alignment,
+        "clothes_fit": clothes_fit,
+        "mobility": mobility,
+        "fatigue": fatigue,
+        "breathing": breathing,
+        "balance_issues": balance_issues,
+    }
+    return responses, uploaded_files
+
+def submit_assessment(responses, uploaded_files):
+    # Runs once per submit: analyze the photos, then score and report deterministically from the answers
+    pose = None
+    images = {view: uploaded.getvalue() for view, uploaded in uploaded_files.items() if uploaded is not None}
+    if images:
+        try:
+            # The views run side by side in the worker processes, so three photos take about as long as one;
+            # resubmitting the same photos hits the cache
+            futures = get_service().submit_all(
+                images, per_image={view: {"required_landmarks": REQUIRED_LANDMARKS[view]} for view in images})
+        except ServiceBusy:
+            st.warning("⏳ The image analysis service is busy right now. Please submit again in a few seconds.")
+            return None
+
+        results = {}
+        with st.spinner('Analyzing images...'), instrumentation.stage("image_request"):
+            for view, future in futures.items():
+                try:
+                    results[view] = future.result()
+                except Exception as e:
+                    st.error(f"Image analysis of the {view} view failed: {e}")
+                    continue
+                # The worker's stages (decode, inference, ...) for the debug panel
+                instrumentation.extend_trace(future.trace)
+        pose = combine_views(results) if results else None
+
+    # Hip angle from the side view, left/right tilts from the front and back views
+    responses.update(scoring_fields(pose))
+
+    # Calculate the assessment score; the measurements are scored from the responses
+    with instrumentation.stage("scoring"):
+        score = calculate_score(responses)
+
+    # Determine risk level
+    risk_level = get_risk_level(score)
+
+    with instrumentation.stage("report"):
+        report = generate_report(risk_level, responses, score)
+
+    # Keep the screening for cohort analytics when a store is configured
+    try:
+        store = get_store()
+        if store is not None:
+            with instrumentation.stage("store"):
+                if pose is not None:
+                    store.append(responses, score, risk_level, pose.metrics, pose.landmarks, pose.model_complexity)
                 else:
-                    st.write("⚠️ No pose landmarks detected. Please upload a clear side or back view image.")
-
-    st.markdown("---")
-
-    # Submit assessment button
-    if st.button("Submit Assessment"):
-        # Store responses in session state
-        st.session_state.responses = {
-            "age": age,
-            "gender": gender,
-            "height": height,
-            "weight": weight,
-            "occupation": occupation,
-            "pain_present": pain_present,
-            "pain_location": pain_location if pain_present == "Yes" else [],
-            "pain_severity": pain_severity if pain_present == "Yes" else 0,
-            "pain_duration": pain_duration if pain_present == "Yes" else "",
-            "symptom_onset": symptom_onset if pain_present == "Yes" else "",
-            "activity_related_pain": activity_related_pain if pain_present == "Yes" else "",
-            "previous_diagnosis": previous_diagnosis,
-            "family_history": family_history,
-            "past_injuries": past_injuries,
-            "physical_activity_level": physical_activity_level,
-            "screen_time": screen_time,
-            "posture_awareness": posture_awareness,
-            "ergonomic_setup": ergonomic_setup,
-            "sleeping_position": sleeping_position,
-            "shoulder_alignment": shoulder_alignment,
-            "head_alignment": head_alignment,
-            "spinal_curvature": spinal_curvature,
-            "hip_level": hip_level,
-            "foot_alignment": foot_alignment,
-            "clothes_fit": clothes_fit,
-            "mobility": mobility,
-            "fatigue": fatigue,
-            "breathing": breathing,
-            "balance_issues": balance_issues,
-            "hip_angle": hip_angle if 'hip_angle' in locals() else None
-        }
-
-        # Calculate the assessment score
-        score = st.session_state.score
-
-        if pain_present == "Yes":
-            score += 2
-            if pain_severity >= 7:
-                score += 2
-            elif pain_severity >= 4:
-                score += 1
-            if pain_duration in ["6 months to a year", "Over a year"]:
-                score += 2
-            if symptom_onset == "Suddenly":
-                score += 1
-            if activity_related_pain == "Yes":
-                score += 1
-
-        if previous_diagnosis == "Yes":
-            score += 3
-        if family_history == "Yes":
-            score += 2
-        if past_injuries == "Yes":
-            score += 1
-        if physical_activity_level in ["Sedentary", "Lightly active"]:
-            score += 1
-
-        if screen_time > 6:
-            score += 1
-        if posture_awareness < 5:
-            score += 1
-        if ergonomic_setup == "No":
-            score += 1
-        if sleeping_position == "Stomach":
-            score += 1
-
-        if shoulder_alignment == "Yes":
-            score += 2
-        if head_alignment == "Yes":
-            score += 2
-        if spinal_curvature == "Yes":
-            score += 3
-        if hip_level == "No":
-            score += 2
-        if foot_alignment != "Straight":
-            score += 1
-        if clothes_fit == "Yes":
-            score += 1
-
-        if mobility == "Yes":
-            score += 2
-        if fatigue == "Yes":
-            score += 1
-        if breathing == "Yes":
-            score += 1
-        if balance_issues == "Yes":
-            score += 1
-
-        st.session_state.score = score
-
-        # Determine risk level
-        if score >= 15:
-            risk_level = "High"
-        elif 8 <= score < 15:
-            risk_level = "Moderate"
-        else:
-            risk_level = "Low"
-
-        # Display assessment results
-        st.success("📄 **Assessment Complete! Please see your report below.**")
-        st.markdown("### 📊 **Your Posture Assessment Report**")
-        st.write(f"**Risk Level:** {risk_level}")
-
-        st.markdown("#### **Summary of Findings:**")
-        if risk_level == "High":
-            st.write("You are at **high risk** for posture-related issues or scoliosis. It is strongly recommended to consult a healthcare professional for a comprehensive evaluation.")
-        elif risk_level == "Moderate":
-            st.write("You are at **moderate risk** for posture-related issues. Consider taking proactive steps to improve your posture and reduce risk factors.")
+                    store.append(responses, score, risk_level)
+    except Exception:
+        # e.g. a full disk or an unreadable store; the user still gets their results
+        logger.warning("Could not save the assessment", exc_info=True)
+
+    assessment = {
+        "responses": responses,
+        "pose": pose,
+        "score": score,
+        "risk_level": risk_level,
+        "report": report,
+    }
+    st.session_state.assessment = assessment
+    return assessment
+
+def show_pose_result(result):
+    if not result.views:
+        return
+
+    # Display each view's annotated preview, encoded once by the inference worker
+    columns = st.columns(len(result.views))
+    for column, (view, pose) in zip(columns, result.views.items()):
+        with column:
+            st.markdown(f"**{view.capitalize()} view**")
+            if pose.landmarks is not None:
+                show_preview(pose.preview)
+            else:
+                st.write("⚠️ No pose landmarks detected. Please upload a clear, full-body image.")
+
+    # Tilts need both sides of the body clearly visible; say so rather than silently leaving them out
+    unmeasured = [name.replace("_", " ") for name in CORONAL_METRICS if result.metrics.get(name) is None]
+    if unmeasured and {"front", "back"} & set(result.views):
+        st.info(f"ℹ️ Could not measure {', '.join(unmeasured)} from the front/back photos; "
+                "they do not count towards your score.")
+
+    hip_angle = result.hip_angle
+    if hip_angle is not None:
+        st.write(f"**Hip Angle:** {hip_angle:.2f} degrees")
+
+        # Analyze hip angle
+        if hip_angle < HIP_ANGLE_THRESHOLD:
+            st.write("🔴 **Your hip angle indicates a possible issue with posture.**")
         else:
-            st.write("You are at **low risk** for posture-related issues. Continue maintaining good posture habits to sustain your spinal health.")
-
-        st.markdown("#### **Recommendations:**")
-
-        if risk_level == "Low":
-            st.write("- **Maintain Good Posture:** Continue being mindful of your posture during daily activities.")
-            st.write("- **Regular Exercise:** Incorporate stretching and strengthening exercises to support spinal health.")
-            st.write("- **Ergonomic Practices:** Ensure your workspace remains ergonomic to prevent future issues.")
-
-        elif risk_level == "Moderate":
-            st.write("- **Posture Improvement Exercises:** Start specific exercises to enhance your posture.")
-            st.write("- **Ergonomic Adjustments:** Reevaluate and adjust your workspace setup for better ergonomics.")
-            st.write("- **Reduce Screen Time:** Take regular breaks to move and stretch during prolonged sitting periods.")
-
-        elif risk_level == "High":
-            st.write("- **Consult a Healthcare Professional:** Seek professional medical advice for a comprehensive evaluation.")
-            st.write("- **Targeted Physical Therapy:** Begin physical therapy exercises as recommended by a professional.")
-            st.write("- **Lifestyle Adjustments:** Implement significant ergonomic and lifestyle changes to support spinal health.")
-
-        st.markdown("#### **Safe Exercises Suggestions:**")
-
-        if risk_level in ["Moderate", "High"]:
-            st.subheader("🧘 **Stretching Exercises:**")
-            st.write("- **Neck Stretch:** Gently tilt your head towards each shoulder. Hold for 15 seconds on each side.")
-            st.write("- **Chest Stretch:** Clasp your hands behind your back and gently lift your arms to stretch the chest muscles.")
-
-            st.subheader("💪 **Strengthening Exercises:**")
-            st.write("- **Planks:** Strengthen your core muscles by holding a plank position for 20-30 seconds. Gradually increase the duration.")
-            st.write("- **Bridges:** Strengthen your lower back and glutes by lying on your back with knees bent and lifting your hips off the ground.")
-
-            st.subheader("🧍 **Postural Awareness:**")
-            st.write("- **Wall Angels:** Stand against a wall and move your arms up and down to improve shoulder alignment.")
-            st.write("- **Seated Posture Correction:** Regularly check and adjust your sitting posture to maintain spinal alignment.")
-
-            st.markdown("*Note: Perform all exercises slowly and stop if you experience any pain. Consult with a healthcare professional before starting any new exercise regimen.*")
-
-        st.markdown("#### **Lifestyle Recommendations:**")
-        if risk_level in ["Moderate", "High"]:
-            st.write("- **Ergonomic Adjustments:** Set up your workspace to promote good posture, including chair and desk height adjustments.")
-            st.write("- **Movement Breaks:** Take short breaks every 30 minutes to stand, stretch, and move around.")
-            st.write("- **Mindfulness Practices:** Incorporate activities like yoga or tai chi to enhance body awareness and posture.")
-
-        st.markdown("---")
-        report = generate_report(risk_level, st.session_state.responses, score)
-        st.download_button(
-            label="📥 Download Your Report",
-            data=report,
-            file_name="Posture_Assessment_Report.txt",
-            mime="text/plain",
-        )
-
-        st.button("🔄 Reset Assessment", on_click=reset_assessment)
-
-    st.markdown("---")
-    st.warning(
-        "**Disclaimer:** This tool provides general information and is not a substitute for professional medical diagnosis or treatment. If you suspect you have scoliosis or any serious posture-related issues, please consult a healthcare professional."
-    )
-
-def generate_report(risk_level, responses, score):
-    report = f"""
-**Posture and Scoliosis Assessment Report**
+            st.write("🟢 **Your hip angle is within a normal range.**")
+
+    # Show the full set of posture metrics combined across the views
+    with st.expander("Detailed posture metrics"):
+        st.caption("Tilts are measured from the front and back views (positive when your left side is higher); "
+                   "angles from the side view. Model complexity per view: "
+                   + ", ".join(f"{view} {pose.model_complexity}" for view, pose in result.views.items()))
+        for name, value in result.metrics.items():
+            label = name.replace("_", " ").capitalize()
+            st.write(f"**{label}:** " + ("not measured" if value is None else f"{value:.1f}°"))
+
+def show_preview(preview):
+    if preview.overlay is not None:
+        # Vector overlay: the browser draws the skeleton over the photo
+        st.image(preview.overlay, caption='Analyzed Image', width=preview.width)
+    elif preview.mime_type == "image/jpeg":
+        # No wider than the display width, so Streamlit serves these bytes unchanged
+        st.image(preview.data, caption='Analyzed Image', width=preview.width)
+    else:
+        # Streamlit would re-encode other formats as JPEG; a data URL passes them through
+        url = f"data:{preview.mime_type};base64," + base64.b64encode(preview.data).decode("ascii")
+        st.image(url, caption='Analyzed Image', width=preview.width)
 
-**Risk Level:** {risk_level}
+def show_results(assessment):
+    risk_level = assessment["risk_level"]
 
-**Total Score:** {score}
+    if assessment["pose"] is not None:
+        st.markdown("### 🖼️ **Image Analysis**")
+        show_pose_result(assessment["pose"])
 
----
+    # Display assessment results
+    st.success("📄 **Assessment Complete! Please see your report below.**")
+    st.markdown("### 📊 **Your Posture Assessment Report**")
+    st.write(f"**Risk Level:** {risk_level}")
 
-**Summary of Findings:**
-"""
+    st.markdown("#### **Summary of Findings:**")
     if risk_level == "High":
-        report += "You are at high risk for posture-related issues or scoliosis. It is strongly recommended to consult a healthcare professional for a comprehensive evaluation.\n"
+        st.write("You are at **high risk** for posture-related issues or scoliosis. It is strongly recommended to consult a healthcare professional for a comprehensive evaluation.")
     elif risk_level == "Moderate":
-        report += "You are at moderate risk for posture-related issues. Consider taking proactive steps to improve your posture and reduce risk factors.\n"
+        st.write("You are at **moderate risk** for posture-related issues. Consider taking proactive steps to improve your posture and reduce risk factors.")
     else:
-        report += "You are at low risk for posture-related issues. Continue maintaining good posture habits to sustain your spinal health.\n"
+        st.write("You are at **low risk** for posture-related issues. Continue maintaining good posture habits to sustain your spinal health.")
 
-    report += "\n---\n\n**Recommendations:**\n"
+    st.markdown("#### **Recommendations:**")
 
     if risk_level == "Low":
-        report += """
-- **Maintain Good Posture:** Continue being mindful of your posture during daily activities.
-- **Regular Exercise:** Incorporate stretching and strengthening exercises to support spinal health.
-- **Ergonomic Practices:** Ensure your workspace remains ergonomic to prevent future issues.
-"""
+        st.write("- **Maintain Good Posture:** Continue being mindful of your posture during daily activities.")
+        st.write("- **Regular Exercise:** Incorporate stretching and strengthening exercises to support spinal health.")
+        st.write("- **Ergonomic Practices:** Ensure your workspace remains ergonomic to prevent future issues.")
+
     elif risk_level == "Moderate":
-        report += """
-- **Posture Improvement Exercises:** Start specific exercises to enhance your posture.
-- **Ergonomic Adjustments:** Reevaluate and adjust your workspace setup for better ergonomics.
-- **Reduce Screen Time:** Take regular breaks to move and stretch during prolonged sitting periods.
-"""
+        st.write("- **Posture Improvement Exercises:** Start specific exercises to enhance your posture.")
+        st.write("- **Ergonomic Adjustments:** Reevaluate and adjust your workspace setup for better ergonomics.")
+        st.write("- **Reduce Screen Time:** Take regular breaks to move and stretch during prolonged sitting periods.")
+
     elif risk_level == "High":
-        report += """
-- **Consult a Healthcare Professional:** Seek professional medical advice for a comprehensive evaluation.
-- **Targeted Physical Therapy:** Begin physical therapy exercises as recommended by a professional.
-- **Lifestyle Adjustments:** Implement significant ergonomic and lifestyle changes to support spinal health.
-"""
+        st.write("- **Consult a Healthcare Professional:** Seek professional medical advice for a comprehensive evaluation.")
+        st.write("- **Targeted Physical Therapy:** Begin physical therapy exercises as recommended by a professional.")
+        st.write("- **Lifestyle Adjustments:** Implement significant ergonomic and lifestyle changes to support spinal health.")
+
+    st.markdown("#### **Safe Exercises Suggestions:**")
 
-    report += "\n---\n\n**Safe Exercises Suggestions:**\n"
     if risk_level in ["Moderate", "High"]:
-        report += """
-**Stretching Exercises:**
-- **Neck Stretch:** Gently tilt your head towards each shoulder. Hold for 15 seconds on each side.
-- **Chest Stretch:** Clasp your hands behind your back and gently lift your arms to stretch the chest muscles.
+        st.subheader("🧘 **Stretching Exercises:**")
+        st.write("- **Neck Stretch:** Gently tilt your head towards each shoulder. Hold for 15 seconds on each side.")
+        st.write("- **Chest Stretch:** Clasp your hands behind your back and gently lift your arms to stretch the chest muscles.")
 
-**Strengthening Exercises:**
-- **Planks:** Strengthen your core muscles by holding a plank position for 20-30 seconds. Gradually increase the duration.
-- **Bridges:** Strengthen your lower back and glutes by lying on your back with knees bent and lifting your hips off the ground.
+        st.subheader("💪 **Strengthening Exercises:**")
+        st.write("- **Planks:** Strengthen your core muscles by holding a plank position for 20-30 seconds. Gradually increase the duration.")
+        st.write("- **Bridges:** Strengthen your lower back and glutes by lying on your back with knees bent and lifting your hips off the ground.")
 
-**Postural Awareness:**
-- **Wall Angels:** Stand against a wall and move your arms up and down to improve shoulder alignment.
-- **Seated Posture Correction:** Regularly check and adjust your sitting posture to maintain spinal alignment.
+        st.subheader("🧍 **Postural Awareness:**")
+        st.write("- **Wall Angels:** Stand against a wall and move your arms up and down to improve shoulder alignment.")
+        st.write("- **Seated Posture Correction:** Regularly check and adjust your sitting posture to maintain spinal alignment.")
 
-*Note: Perform all exercises slowly and stop if you experience any pain. Consult with a healthcare professional before starting any new exercise regimen.*
-"""
+        st.markdown("*Note: Perform all exercises slowly and stop if you experience any pain. Consult with a healthcare professional before starting any new exercise regimen.*")
 
-    report += "\n---\n\n**Lifestyle Recommendations:**\n"
+    st.markdown("#### **Lifestyle Recommendations:**")
     if risk_level in ["Moderate", "High"]:
-        report += """
-- **Ergonomic Adjustments:** Set up your workspace to promote good posture, including chair and desk height adjustments.
-- **Movement Breaks:** Take short breaks every 30 minutes to stand, stretch, and move around.
-- **Mindfulness Practices:** Incorporate activities like yoga or tai chi to enhance body awareness and posture.
-"""
+        st.write("- **Ergonomic Adjustments:** Set up your workspace to promote good posture, including chair and desk height adjustments.")
+        st.write("- **Movement Breaks:** Take short breaks every 30 minutes to stand, stretch, and move around.")
+        st.write("- **Mindfulness Practices:** Incorporate activities like yoga or tai chi to enhance body awareness and posture.")
 
-    report += "\n---\n\n**Disclaimer:** This report provides general information and is not a substitute for professional medical diagnosis or treatment. If you suspect you have scoliosis or any serious posture-related issues, please consult a healthcare professional."
+    st.markdown("---")
+    st.download_button(
+        label="📥 Download Your Report",
+        data=assessment["report"],
+        file_name="Posture_Assessment_Report.txt",
+        mime="text/plain",
+    )
 
-    return report
+    st.button("🔄 Reset Assessment", on_click=reset_assessment)
+
+def show_monitoring():
+    # Video and webcam monitoring are separate from the scored assessment
+    st.header("8. Posture Monitoring")
+    analysis_mode = st.radio("How would you like to monitor your posture?", ("Video file", "Live webcam"), horizontal=True)
+
+    if analysis_mode == "Video file":
+        st.write("Upload a **side view** video to track your posture over time.")
+        uploaded_video = st.file_uploader("Choose a video...", type=["mp4", "mov", "avi"])
+        target_fps = st.slider("Frames analyzed per second", 1, 30, 10)
+        if uploaded_video is not None and st.button("Analyze video"):
+            # OpenCV reads from a path, so spool the upload to a temporary file
+            with tempfile.NamedTemporaryFile(suffix="." + uploaded_video.name.rsplit(".", 1)[-1]) as video_file:
+                video_file.write(uploaded_video.getvalue())
+                video_file.flush()
+                show_posture_stream(video_file.name, target_fps, live=False)
+
+    elif analysis_mode == "Live webcam":
+        st.write("Sit in **side view** of the webcam on the computer running this app to monitor your posture continuously.")
+        target_fps = st.slider("Frames analyzed per second", 1, 30, 10)
+        if st.checkbox("Start monitoring"):
+            show_posture_stream(0, target_fps, live=True)
+
+def show_performance_panel(trace):
+    with st.sidebar:
+        st.markdown("### Performance (this run)")
+        if trace:
+            st.dataframe(trace)
+        else:
+            st.write("No instrumented stages ran.")
+        show_service_stats()
+        for profile in reversed(instrumentation.slow_profiles):
+            with st.expander(f"Slow {profile['name']} request: {profile['seconds']:.2f}s"):
+                st.caption(profile["path"] or "not written to disk")
+                st.code(profile["collapsed"][:5000])
+
+def show_service_stats():
+    from pose_cache import get_cache
+
+    service = get_service()
+    with st.sidebar:
+        st.markdown("**Inference service**")
+        st.json(service.stats())
+        st.markdown("**Worker estimator pools**")
+        st.json(service.pool_stats())
+        st.markdown("**Result cache**")
+        st.json(get_cache().stats())
+        st.markdown("**Answers per model complexity**")
+        st.json(dict(service.tier_counts))
+
+def show_posture_stream(source, target_fps, live):
+    streaming = vision.streaming()
+    draw_tracked, per_second, track = streaming.draw_tracked, streaming.per_second, streaming.track
+
+    frame_placeholder = st.empty()
+    status_placeholder = st.empty()
+    chart_placeholder = st.empty()
+    summaries = []
+
+    for summary, frame in per_second(track(source, target_fps=target_fps, live=live)):
+        if summary is not None:
+            summaries.append(summary)
+            chart_placeholder.line_chart(
+                [{key: row[key] for key in ("left_hip_angle", "trunk_lean", "shoulder_tilt")} for row in summaries])
+        if frame is None:
+            continue
+        frame_placeholder.image(draw_tracked(frame), caption=f"{frame.timestamp:.1f}s", width=400)
+        if frame.metrics is None:
+            status_placeholder.write("⚠️ No pose detected in the current frame.")
+        elif frame.metrics["left_hip_angle"] is not None:
+            status_placeholder.write(f"**Hip Angle:** {frame.metrics['left_hip_angle']:.2f} degrees")
+
+    if summaries:
+        st.markdown("#### **Posture metrics per second**")
+        st.dataframe(summaries)
 
 if __name__ == "__main__":
     main()
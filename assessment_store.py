@@ -0,0 +1,428 @@
+"""Append-only on-disk store of submitted assessments.
+
+Each column is a flat binary file of fixed-width values: questionnaire
+choices as small integer codes (0 = not answered), numbers as uint8/float32,
+landmarks as float32 (33, 4) blocks. meta.json records the committed row
+count and is rewritten only after a batch has been appended to every column,
+so a crash mid-write loses at most that batch.
+
+Rows are buffered and written in batches. Secondary indexes on risk level,
+age band, occupation and submission date (UTC) are append-only files of row
+numbers, one per value. Reads go through read-only memory maps, so aggregate
+queries touch only the columns and rows they need:
+
+    store = AssessmentStore("assessments", readonly=True)
+    store.risk_distribution(by="occupation", since="2024-01-01")
+    store.histogram("trunk_lean", bins=30, risk_level="High")
+
+One process writes a store directory; any number may read it.
+
+Any change to COLUMNS (including geometry.METRIC_NAMES) must bump
+SCHEMA_VERSION and add a MIGRATIONS entry that upgrades a store from the
+previous version. Stores are upgraded when opened for writing.
+"""
+
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from geometry import METRIC_NAMES
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("ASSESSMENT_STORE_BATCH", "32"))
+DEFAULT_FLUSH_SECONDS = float(os.environ.get("ASSESSMENT_STORE_FLUSH_SECONDS", "5"))
+SCHEMA_VERSION = 2
+
+# Rows per chunk when aggregating, so memory stays flat for any store size
+CHUNK_ROWS = 1 << 20
+
+YES_NO = ("Yes", "No")
+RISK_LEVELS = ("Low", "Moderate", "High")
+
+# Questionnaire choices in the app's order; a value's code is its position + 1
+ENUM_FIELDS = {
+    "gender": ("Male", "Female", "Prefer not to say", "Other"),
+    "occupation": ("Student", "Office Worker", "Manual Labor", "Other"),
+    "pain_present": YES_NO,
+    "pain_duration": ("Less than a month", "1-6 months", "6 months to a year", "Over a year"),
+    "symptom_onset": ("Gradually", "Suddenly"),
+    "activity_related_pain": YES_NO,
+    "previous_diagnosis": YES_NO,
+    "family_history": YES_NO,
+    "past_injuries": YES_NO,
+    "physical_activity_level": ("Sedentary", "Lightly active", "Moderately active", "Very active"),
+    "ergonomic_setup": YES_NO,
+    "sleeping_position": ("Back", "Side", "Stomach", "Other"),
+    "shoulder_alignment": YES_NO,
+    "head_alignment": YES_NO,
+    "spinal_curvature": YES_NO,
+    "hip_level": YES_NO,
+    "foot_alignment": ("Straight", "Inward", "Outward"),
+    "clothes_fit": YES_NO,
+    "mobility": YES_NO,
+    "fatigue": YES_NO,
+    "breathing": YES_NO,
+    "balance_issues": YES_NO,
+    "risk_level": RISK_LEVELS,
+}
+INT_FIELDS = ("age", "height", "weight", "pain_severity", "screen_time", "posture_awareness")
+PAIN_LOCATIONS = ("Upper Back", "Lower Back", "Neck", "Shoulders", "Other")
+
+# (lower bound, label); age 0 means not given
+AGE_BANDS = ((0, "under 18"), (18, "18-29"), (30, "30-44"), (45, "45-64"), (65, "65 and over"))
+
+# name -> (dtype, per-row shape)
+COLUMNS = {
+    "submitted_at": ("<i8", ()),
+    **{field: ("u1", ()) for field in ENUM_FIELDS},
+    **{field: ("u1", ()) for field in INT_FIELDS},
+    "pain_location": ("u1", ()),  # bit i set = PAIN_LOCATIONS[i]
+    "score": ("<f4", ()),
+    "hip_angle": ("<f4", ()),
+    **{name: ("<f4", ()) for name in METRIC_NAMES},
+    "model_complexity": ("i1", ()),  # -1 = no image
+    "landmarks": ("<f4", (33, 4)),
+}
+
+INDEXES = ("risk_level", "age_band", "occupation", "date")
+
+_CODES = {field: {label: code for code, label in enumerate(choices, 1)} for field, choices in ENUM_FIELDS.items()}
+_AGE_BOUNDS = np.array([bound for bound, _ in AGE_BANDS[1:]])
+_NO_LANDMARKS = np.full((33, 4), np.nan, dtype=np.float32)
+
+
+def age_band_codes(ages):
+    # Band code is the AGE_BANDS position + 1, 0 where the age was not given
+    ages = np.asarray(ages)
+    return np.where(ages > 0, np.digitize(ages, _AGE_BOUNDS) + 1, 0).astype(np.uint8)
+
+
+def _labels(field):
+    if field == "age_band":
+        return tuple(label for _, label in AGE_BANDS)
+    return ENUM_FIELDS[field]
+
+
+def _day(value):
+    # date, datetime or "YYYY-MM-DD..." -> "YYYY-MM-DD"
+    return value.isoformat()[:10] if hasattr(value, "isoformat") else str(value)[:10]
+
+
+def _number(value, default=np.nan):
+    return default if value is None or value == "" else value
+
+
+def decode(field, codes):
+    """Turn an array of codes back into labels, None where not answered."""
+    labels = np.array((None,) + _labels(field), dtype=object)
+    return labels[np.asarray(codes)]
+
+
+class AssessmentStore:
+    def __init__(self, path, readonly=False, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_SECONDS):
+        self.path = path
+        self.readonly = readonly
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._timer = None
+        self._rows = 0
+
+        if not readonly:
+            os.makedirs(os.path.join(path, "index"), exist_ok=True)
+            if not os.path.exists(self._meta_path()):
+                self._write_meta()
+        self.refresh()
+        if not readonly:
+            self._recover()
+
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _index_path(self, index, key):
+        return os.path.join(self.path, "index", index, f"{key}.rows")
+
+    def _write_meta(self):
+        meta = {
+            "version": SCHEMA_VERSION,
+            "rows": self._rows,
+            "columns": {name: [dtype, list(shape)] for name, (dtype, shape) in COLUMNS.items()},
+            "enums": ENUM_FIELDS,
+        }
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def refresh(self):
+        # Pick up rows committed by the writer since this store was opened
+        with open(self._meta_path(), encoding="utf-8") as f:
+            meta = json.load(f)
+        version = meta["version"]
+        if version < SCHEMA_VERSION and not self.readonly:
+            self._rows = meta["rows"]
+            for migrate in range(version, SCHEMA_VERSION):
+                MIGRATIONS[migrate](self)
+            self._write_meta()
+            return
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"{self.path} has assessment store schema version {version}, expected {SCHEMA_VERSION}"
+                             + (" (open it writable once to upgrade it)" if version < SCHEMA_VERSION else ""))
+        columns = {name: (dtype, tuple(shape)) for name, (dtype, shape) in meta["columns"].items()}
+        if columns != COLUMNS:
+            raise ValueError(f"{self.path} does not match schema version {SCHEMA_VERSION}; "
+                             f"was COLUMNS changed without bumping SCHEMA_VERSION?")
+        self._rows = meta["rows"]
+
+    def _add_column(self, name):
+        # For migrations: a new column reads as not measured (NaN) or not answered (0) in existing rows
+        dtype, shape = COLUMNS[name]
+        fill = np.nan if np.dtype(dtype).kind == "f" else 0
+        np.full((self._rows,) + shape, fill, dtype=dtype).tofile(self._column_path(name))
+
+    def _recover(self):
+        # Drop whatever an interrupted flush wrote past the committed row count
+        for name, (dtype, shape) in COLUMNS.items():
+            path = self._column_path(name)
+            size = self._rows * np.dtype(dtype).itemsize * int(np.prod(shape))
+            with open(path, "ab") as f:
+                if f.tell() > size:
+                    f.truncate(size)
+        for index in INDEXES:
+            directory = os.path.join(self.path, "index", index)
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                ids = np.fromfile(path, dtype="<u4")
+                keep = np.searchsorted(ids, self._rows)
+                if keep < len(ids):
+                    ids[:keep].tofile(path)
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, responses, score, risk_level, metrics=None, landmarks=None, model_complexity=None,
+               submitted_at=None):
+        """Queue one assessment; it is written with the next batch.
+
+        ``responses`` is the app's responses dict (including ``hip_angle``),
+        ``metrics`` maps geometry.METRIC_NAMES to degrees or None. Choices the
+        schema does not know are stored as not answered.
+        """
+        if self.readonly:
+            raise RuntimeError("assessment store is open read-only")
+        row = {field: _CODES[field].get(responses.get(field), 0) for field in ENUM_FIELDS}
+        row["risk_level"] = _CODES["risk_level"][risk_level]
+        for field in INT_FIELDS:
+            row[field] = min(max(int(_number(responses.get(field), 0)), 0), 255)
+        locations = responses.get("pain_location") or ()
+        row["pain_location"] = sum(1 << i for i, location in enumerate(PAIN_LOCATIONS) if location in locations)
+        row["submitted_at"] = int(time.time() if submitted_at is None else submitted_at)
+        row["score"] = score
+        row["hip_angle"] = _number(responses.get("hip_angle"))
+        metrics = metrics or {}
+        for name in METRIC_NAMES:
+            row[name] = _number(metrics.get(name))
+        row["model_complexity"] = -1 if model_complexity is None else model_complexity
+        row["landmarks"] = _NO_LANDMARKS if landmarks is None else landmarks
+
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+            elif self._timer is None and self.flush_interval:
+                # A quiet server still gets its last few rows onto disk
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            start = self._rows
+
+            for name, (dtype, shape) in COLUMNS.items():
+                values = np.array([row[name] for row in rows], dtype=dtype).reshape((len(rows),) + shape)
+                with open(self._column_path(name), "ab") as f:
+                    f.write(values.tobytes())
+
+            ids = np.arange(start, start + len(rows), dtype="<u4")
+            keys = {
+                "risk_level": [row["risk_level"] for row in rows],
+                "age_band": age_band_codes([row["age"] for row in rows]).tolist(),
+                "occupation": [row["occupation"] for row in rows],
+                "date": [datetime.datetime.fromtimestamp(row["submitted_at"], datetime.timezone.utc).date().isoformat()
+                         for row in rows],
+            }
+            for index in INDEXES:
+                index_keys = np.array(keys[index])
+                for key in set(keys[index]):
+                    with open(self._index_path(index, key), "ab") as f:
+                        f.write(ids[index_keys == key].tobytes())
+
+            # Commit point: readers only ever see rows counted here
+            self._rows = start + len(rows)
+            self._write_meta()
+
+    def close(self):
+        if not self.readonly:
+            self.flush()
+
+    def column(self, name):
+        """Read-only memory map over a column's committed rows."""
+        dtype, shape = COLUMNS[name]
+        if self._rows == 0:
+            return np.empty((0,) + shape, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(self._rows,) + shape)
+
+    def _postings(self, index, keys):
+        parts = []
+        for key in keys:
+            path = self._index_path(index, key)
+            if os.path.exists(path):
+                ids = np.fromfile(path, dtype="<u4")
+                parts.append(ids[:np.searchsorted(ids, self._rows)])
+        # Postings of different keys are disjoint, so sorting is enough to merge them
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype="<u4")
+
+    def _select(self, risk_level=None, age_band=None, occupation=None, since=None, until=None):
+        selections = []
+        for index, value in (("risk_level", risk_level), ("age_band", age_band), ("occupation", occupation)):
+            if value is None:
+                continue
+            labels = [value] if isinstance(value, str) else list(value)
+            unknown = set(labels) - set(_labels(index))
+            if unknown:
+                raise ValueError(f"unknown {index} values: {sorted(unknown)}")
+            selections.append(self._postings(index, [_labels(index).index(label) + 1 for label in labels]))
+        if since is not None or until is not None:
+            directory = os.path.join(self.path, "index", "date")
+            days = [name[:-len(".rows")] for name in os.listdir(directory)] if os.path.isdir(directory) else []
+            days = [day for day in days
+                    if (since is None or day >= _day(since)) and (until is None or day <= _day(until))]
+            selections.append(self._postings("date", days))
+
+        if not selections:
+            return None
+        rows = selections[0]
+        for other in selections[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def select(self, **filters):
+        """Row numbers matching every filter, in insertion order.
+
+        Filters: ``risk_level``, ``age_band`` and ``occupation`` take a label
+        or a list of labels; ``since`` and ``until`` take dates (inclusive).
+        """
+        rows = self._select(**filters)
+        return np.arange(self._rows, dtype="<u4") if rows is None else rows
+
+    def count(self, **filters):
+        rows = self._select(**filters)
+        return self._rows if rows is None else len(rows)
+
+    def _chunks(self, name, rows):
+        if name == "age_band":
+            for ages in self._chunks("age", rows):
+                yield age_band_codes(ages)
+            return
+        # Always at least one (possibly empty) chunk, so callers need no special case
+        column = self.column(name)
+        if rows is None:
+            for start in range(0, max(len(column), 1), CHUNK_ROWS):
+                yield np.asarray(column[start:start + CHUNK_ROWS])
+        else:
+            for start in range(0, max(len(rows), 1), CHUNK_ROWS):
+                yield column[rows[start:start + CHUNK_ROWS]]
+
+    def read(self, columns=None, decode_enums=False, **filters):
+        """Copy the selected rows of ``columns`` (default: all) into memory."""
+        rows = self._select(**filters)
+        result = {}
+        for name in columns or COLUMNS:
+            values = np.concatenate(list(self._chunks(name, rows)))
+            if decode_enums and (name in ENUM_FIELDS or name == "age_band"):
+                values = decode(name, values)
+            result[name] = values
+        return result
+
+    def risk_distribution(self, by=None, **filters):
+        """Assessments per risk level, overall or per value of an enum field or "age_band".
+
+        Returns {group label: {risk level: count}}; the group label is None
+        for assessments where ``by`` was not answered.
+        """
+        rows = self._select(**filters)
+        labels = _labels(by) if by else ("all",)
+        counts = np.zeros((len(labels) + 1, len(RISK_LEVELS) + 1), dtype=np.int64)
+        groups = self._chunks(by, rows) if by else None
+        for risk in self._chunks("risk_level", rows):
+            group = next(groups) if by else np.ones(len(risk), dtype=np.uint8)
+            flat = group.astype(np.intp) * counts.shape[1] + risk
+            counts += np.bincount(flat, minlength=counts.size).reshape(counts.shape)
+
+        distribution = {}
+        for label, row in zip((None,) + labels, counts):
+            if row.any():
+                distribution[label] = {level: int(count) for level, count in zip(RISK_LEVELS, row[1:])}
+        return distribution
+
+    def histogram(self, name, bins=20, range=None, **filters):
+        """Histogram of a numeric column, e.g. "hip_angle" or a metric name.
+
+        Returns (counts, bin edges) like numpy.histogram; NaN values (not
+        measured) are left out.
+        """
+        rows = self._select(**filters)
+        if range is None:
+            low, high = np.inf, -np.inf
+            for values in self._chunks(name, rows):
+                finite = values[np.isfinite(values)] if values.dtype.kind == "f" else values
+                if len(finite):
+                    low, high = min(low, float(finite.min())), max(high, float(finite.max()))
+            range = (low, high) if low <= high else (0.0, 1.0)
+        edges = np.histogram_bin_edges([], bins=bins, range=range)
+        counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        for values in self._chunks(name, rows):
+            if values.dtype.kind == "f":
+                values = values[np.isfinite(values)]
+            counts += np.histogram(values, bins=edges)[0]
+        return counts, edges
+
+
+# Upgrades from version n to n + 1, run in order by a writable store
+MIGRATIONS = {
+    # 2: head_tilt metric for the multi-view assessment
+    1: lambda store: store._add_column("head_tilt"),
+}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    # None unless ASSESSMENT_STORE_DIR is set
+    global _store
+    path = os.environ.get("ASSESSMENT_STORE_DIR")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = AssessmentStore(path)
+            atexit.register(_store.close)
+        return _store
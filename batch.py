@@ -0,0 +1,327 @@
+"""Headless batch scoring of posture images and questionnaire responses.
+
+Example:
+
+    python batch.py images/ --responses responses.jsonl --output results.jsonl --workers 8
+
+Images are matched to response records by file stem: ``images/s0042.jpg``
+pairs with the record whose ``id`` is ``s0042``. Results are appended to the
+output file as they complete, so an interrupted run resumes where it stopped.
+With ``--store``, scored records are also appended to an AssessmentStore.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from assessment_store import AssessmentStore
+from geometry import METRIC_NAMES
+from multiview import combine_views, scoring_fields
+from pose_analysis import DEFAULT_TIER_MIN_VISIBILITY, DEFAULT_TIERS, analyze_image_tiered
+from pose_pool import get_pool
+from report import generate_report
+from scoring import calculate_score, get_risk_level, normalize_responses, rule_weights, score_records
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Response-only records scored per matrix product
+SCORING_CHUNK = 50000
+# Rows per AssessmentStore write; with --store, output rows are written after their batch is stored
+STORE_BATCH = 4096
+
+OUTPUT_FIELDS = ["id", "image", "landmarks_detected", "model_complexity", "hip_angle", *METRIC_NAMES, "score", "risk_level", "report", "error"]
+
+
+def load_responses(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            records = list(csv.DictReader(f))
+        else:
+            records = [json.loads(line) for line in f if line.strip()]
+    return {str(record["id"]): normalize_responses(record) for record in records}
+
+
+def find_images(images_dir):
+    images = {}
+    for name in sorted(os.listdir(images_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in IMAGE_EXTENSIONS:
+            images[stem] = os.path.join(images_dir, name)
+    return images
+
+
+def completed_ids(output_path):
+    # Anything already in the output was finished by a previous run
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, newline="", encoding="utf-8") as f:
+        if output_path.lower().endswith(".csv"):
+            return {row["id"] for row in csv.DictReader(f)}
+        done = set()
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                # A partial last line from an interrupted run is simply redone
+                continue
+        return done
+
+
+def _drop_partial_record(path, terminator):
+    # An interrupted run may have left half a record; appending onto it would garble the next one too
+    with open(path, "rb+") as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        while position > 0:
+            step = min(1 << 16, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            end = tail.rfind(terminator)
+            if end >= 0:
+                f.truncate(position + end + len(terminator))
+                return
+        f.truncate(0)
+
+
+class ResultWriter:
+    def __init__(self, path):
+        self.is_csv = path.lower().endswith(".csv")
+        if os.path.exists(path):
+            # csv ends rows with \r\n; reports inside quoted fields only contain \n
+            _drop_partial_record(path, b"\r\n" if self.is_csv else b"\n")
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        if self.is_csv:
+            self._writer = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+            if new_file:
+                self._writer.writeheader()
+                self._file.flush()
+
+    def write(self, row):
+        if self.is_csv:
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+_worker_options = {}
+
+
+def _init_worker(tiers, min_visibility, latency_budget, include_report, weights):
+    _worker_options.update(tiers=tiers, min_visibility=min_visibility, latency_budget=latency_budget,
+                           include_report=include_report, weights=weights)
+    # Load every tier's model once per worker so no task pays for graph setup
+    for model_complexity in tiers:
+        with get_pool().estimator(model_complexity):
+            pass
+
+
+def score_record(record_id, image_path, responses):
+    row = {"id": record_id, "image": image_path, "landmarks_detected": None, "model_complexity": None, "hip_angle": None,
+           "score": None, "risk_level": None, "report": None, "error": None}
+    view = None
+    try:
+        if image_path is not None:
+            with open(image_path, "rb") as f:
+                result = analyze_image_tiered(
+                    f.read(),
+                    _worker_options["tiers"],
+                    min_visibility=_worker_options["min_visibility"],
+                    latency_budget=_worker_options["latency_budget"],
+                )
+            row["landmarks_detected"] = result.landmarks is not None
+            row["model_complexity"] = result.model_complexity
+            # Batch images are side views; metrics mean the same as the app's multi-view ones,
+            # so left/right tilts stay None without a front or back photo
+            view = combine_views({"side": result})
+            row["hip_angle"] = view.hip_angle
+            row.update(view.metrics)
+
+        if responses is not None:
+            score = calculate_score(dict(responses, **scoring_fields(view)), _worker_options["weights"])
+            row["score"] = score
+            row["risk_level"] = get_risk_level(score)
+            if _worker_options["include_report"]:
+                row["report"] = generate_report(row["risk_level"], responses, score)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def score_responses_only(record_ids, responses, weights, include_report):
+    # Records without an image need no inference, so score them in one matrix product
+    records = [dict(responses[record_id], hip_angle=None) for record_id in record_ids]
+    scores, levels = score_records(records, weights)
+    for record_id, record, score, level in zip(record_ids, records, scores, levels):
+        score = int(score) if float(score).is_integer() else float(score)
+        yield {"id": record_id, "image": None, "landmarks_detected": None, "model_complexity": None, "hip_angle": None,
+               "score": score, "risk_level": str(level),
+               "report": generate_report(str(level), record, score) if include_report else None,
+               "error": None}
+
+
+def run(images_dir, responses_path, output_path, workers, tiers=DEFAULT_TIERS,
+        min_visibility=DEFAULT_TIER_MIN_VISIBILITY, latency_budget=None,
+        include_report=False, max_in_flight=None, weight_overrides=None, store_path=None):
+    images = find_images(images_dir) if images_dir else {}
+    responses = load_responses(responses_path) if responses_path else {}
+    weights = rule_weights(overrides=weight_overrides)
+    # The writer cuts a half-written last record first, so that record is not counted as done
+    writer = ResultWriter(output_path)
+    done = completed_ids(output_path)
+    ids = [record_id for record_id in sorted(set(images) | set(responses)) if record_id not in done]
+    image_ids = [record_id for record_id in ids if record_id in images]
+    response_only_ids = [record_id for record_id in ids if record_id not in images]
+
+    total = len(ids)
+    if done:
+        print(f"Resuming: {len(done)} already done, {total} remaining", file=sys.stderr)
+
+    # Only a bounded window of tasks is queued so memory stays flat for any cohort size
+    max_in_flight = max_in_flight or workers * 4
+    # No timer flushes: the store must never get ahead of the output by more than the batch being written
+    store = AssessmentStore(store_path, batch_size=STORE_BATCH, flush_interval=0) if store_path else None
+    unstored = []
+    started = time.monotonic()
+    last_report = started
+    completed = 0
+    errors = 0
+
+    def commit():
+        # A row in the output counts as done on resume, so it may only get there once it is stored
+        store.flush()
+        for row in unstored:
+            writer.write(row)
+        unstored.clear()
+
+    def record(row):
+        nonlocal completed, errors, last_report
+        if store is None:
+            writer.write(row)
+        else:
+            if row["risk_level"] is not None:
+                store.append(dict(responses[row["id"]], hip_angle=row["hip_angle"]), row["score"], row["risk_level"],
+                             {name: row.get(name) for name in METRIC_NAMES}, model_complexity=row["model_complexity"])
+            unstored.append(row)
+            if len(unstored) >= STORE_BATCH:
+                commit()
+        completed += 1
+        errors += row["error"] is not None
+
+        now = time.monotonic()
+        if now - last_report >= 2 or completed == total:
+            last_report = now
+            elapsed = now - started
+            rate = completed / elapsed if elapsed else 0.0
+            eta = (total - completed) / rate if rate else float("inf")
+            print(
+                f"{completed}/{total} done, {errors} errors, "
+                f"{rate * 3600:.0f} records/hour, ETA {eta:.0f}s",
+                file=sys.stderr,
+            )
+
+    try:
+        for start in range(0, len(response_only_ids), SCORING_CHUNK):
+            chunk = response_only_ids[start:start + SCORING_CHUNK]
+            for row in score_responses_only(chunk, responses, weights, include_report):
+                record(row)
+
+        if not image_ids:
+            return completed, errors
+
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(tiers, min_visibility, latency_budget, include_report, weights),
+        ) as executor:
+            pending = set()
+            queue = iter(image_ids)
+            try:
+                while True:
+                    for record_id in queue:
+                        pending.add(executor.submit(score_record, record_id, images[record_id], responses.get(record_id)))
+                        if len(pending) >= max_in_flight:
+                            break
+                    if not pending:
+                        break
+
+                    finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        record(future.result())
+            finally:
+                for future in pending:
+                    future.cancel()
+    finally:
+        try:
+            if store is not None:
+                commit()
+                store.close()
+        finally:
+            writer.close()
+
+    return completed, errors
+
+
+def parse_tiers(value):
+    tiers = tuple(int(part) for part in value.split(","))
+    if not tiers or any(tier not in (0, 1, 2) for tier in tiers):
+        raise argparse.ArgumentTypeError("tiers must be model complexities 0, 1 or 2")
+    return tiers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score posture images and questionnaire responses in bulk.")
+    parser.add_argument("images_dir", nargs="?", help="Directory of .jpg/.jpeg/.png images named by record id")
+    parser.add_argument("--responses", help="JSONL or CSV file of questionnaire responses with an 'id' column")
+    parser.add_argument("--output", required=True, help="JSONL or CSV file to append results to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tiers", type=parse_tiers, default=DEFAULT_TIERS,
+                        help="Comma-separated model complexities to try in order, e.g. 0,2 (default: %(default)s)")
+    parser.add_argument("--min-visibility", type=float, default=DEFAULT_TIER_MIN_VISIBILITY,
+                        help="Landmark visibility a tier needs for its answer to be accepted")
+    parser.add_argument("--latency-budget", type=float, help="Seconds per image after which no higher tier is tried")
+    parser.add_argument("--report", action="store_true", help="Include the full text report in each result")
+    parser.add_argument("--max-in-flight", type=int, help="Maximum queued tasks (default: 4 per worker)")
+    parser.add_argument("--weights", help="JSON file of {rule name: weight} overrides for scoring.RULES")
+    parser.add_argument("--store", help="AssessmentStore directory to also append scored records to")
+    args = parser.parse_args(argv)
+
+    if not args.images_dir and not args.responses:
+        parser.error("give an images directory, --responses, or both")
+
+    weight_overrides = None
+    if args.weights:
+        with open(args.weights, encoding="utf-8") as f:
+            weight_overrides = json.load(f)
+
+    completed, errors = run(
+        args.images_dir,
+        args.responses,
+        args.output,
+        args.workers,
+        tiers=args.tiers,
+        min_visibility=args.min_visibility,
+        latency_budget=args.latency_budget,
+        include_report=args.report,
+        max_in_flight=args.max_in_flight,
+        weight_overrides=weight_overrides,
+        store_path=args.store,
+    )
+    print(f"Finished {completed} records ({errors} errors)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""Offline benchmark of the upload-to-report assessment pipeline.
+
+Times each stage separately on synthetic inputs (and, optionally, a
+directory of fixture photos) and writes p50/p95/p99 latency, throughput and
+peak Python/NumPy allocation per stage, plus the process's peak RSS, to a
+JSON file:
+
+    python benchmarks/bench_pipeline.py --output bench.json
+    python benchmarks/bench_pipeline.py --save-baseline
+    python benchmarks/bench_pipeline.py --baseline other.json --threshold 0.2
+
+Results are compared against benchmarks/baseline.json (or ``--baseline``)
+when it exists: any stage whose p50 is more than ``threshold`` slower, or
+that ran in the baseline but fails now, makes the run exit non-zero. Record
+the baseline with --save-baseline on the machine you compare on; it is
+refused while any stage fails, e.g. because the pose models of the
+production tiers (complexities 0 and 2) cannot be downloaded. Only stages
+selected with ``--stage`` build their inputs. Synthetic images contain no
+person, so the pose stages only measure detection; pass ``--fixtures`` with
+real photos to include the landmark model.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from functools import partial
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2  # noqa: E402
+import mediapipe as mp  # noqa: E402
+from mediapipe.framework.formats import landmark_pb2  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from geometry import compute_metrics  # noqa: E402
+from ingest import load_image  # noqa: E402
+from pose_pool import PoseEstimatorPool  # noqa: E402
+from preview import render_preview  # noqa: E402
+from report import generate_report  # noqa: E402
+from scoring import calculate_score, get_risk_level, score_records  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+RESOLUTIONS = {"vga": (640, 480), "fhd": (1920, 1080), "12mp": (4032, 3024)}
+SEED = 1234
+
+QUESTION_CHOICES = {
+    "gender": ("Male", "Female", "Prefer not to say", "Other"),
+    "occupation": ("Student", "Office Worker", "Manual Labor", "Other"),
+    "pain_present": ("Yes", "No"),
+    "pain_duration": ("Less than a month", "1-6 months", "6 months to a year", "Over a year"),
+    "symptom_onset": ("Gradually", "Suddenly"),
+    "activity_related_pain": ("Yes", "No"),
+    "previous_diagnosis": ("Yes", "No"),
+    "family_history": ("Yes", "No"),
+    "past_injuries": ("Yes", "No"),
+    "physical_activity_level": ("Sedentary", "Lightly active", "Moderately active", "Very active"),
+    "ergonomic_setup": ("Yes", "No"),
+    "sleeping_position": ("Back", "Side", "Stomach", "Other"),
+    "shoulder_alignment": ("Yes", "No"),
+    "head_alignment": ("Yes", "No"),
+    "spinal_curvature": ("Yes", "No"),
+    "hip_level": ("Yes", "No"),
+    "foot_alignment": ("Straight", "Inward", "Outward"),
+    "clothes_fit": ("Yes", "No"),
+    "mobility": ("Yes", "No"),
+    "fatigue": ("Yes", "No"),
+    "breathing": ("Yes", "No"),
+    "balance_issues": ("Yes", "No"),
+}
+
+
+def synthetic_jpeg(width, height, rng):
+    # Smooth gradients plus noise compress like a photo rather than like pure noise. Built in uint8
+    # (gradients up to 223, noise up to 31) so the harness itself stays small next to the pipeline.
+    columns = (np.arange(width) * 223 // max(width, 1)).astype(np.uint8)
+    rows = (np.arange(height) * 223 // max(height, 1)).astype(np.uint8)
+    pixels = rng.integers(0, 32, size=(height, width, 3), dtype=np.uint8)
+    pixels[..., 0] += columns
+    pixels[..., 1] += rows[:, None]
+    pixels[..., 2] += (columns // 2)[None, :] + (rows // 2)[:, None]
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def synthetic_responses(count, rng):
+    records = []
+    for _ in range(count):
+        record = {field: choices[rng.integers(len(choices))] for field, choices in QUESTION_CHOICES.items()}
+        record.update(
+            age=int(rng.integers(5, 100)),
+            height=int(rng.integers(120, 200)),
+            weight=int(rng.integers(30, 120)),
+            pain_location=["Lower Back"],
+            pain_severity=int(rng.integers(1, 11)),
+            screen_time=int(rng.integers(0, 25)),
+            posture_awareness=int(rng.integers(1, 11)),
+            hip_angle=float(rng.uniform(140, 185)),
+        )
+        records.append(record)
+    return records
+
+
+def synthetic_landmarks(rng):
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in rng.random((33, 4)):
+        landmarks.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmarks
+
+
+def peak_rss_mb():
+    # Whole-process high-water mark, so only meaningful once per run; ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def peak_allocated_mb(fn):
+    # One extra untimed call under tracemalloc; sees Python and NumPy buffers, not native model memory
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def measure(fn, iterations, warmup, items=1):
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {
+        "iterations": iterations,
+        "items_per_call": items,
+        "mean_ms": float(samples.mean() * 1000),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "throughput_per_s": float(items * iterations / samples.sum()),
+        "peak_allocated_mb": float(peak_allocated_mb(fn)),
+    }
+
+
+def run_benchmarks(iterations, warmup, complexities, fixtures_dir=None, stages=None):
+    results = {}
+
+    def bench(name, fn, *inputs, iterations=iterations, items=1):
+        # Inputs are built only for the stages that run, so --stage keeps the harness small
+        if stages and not any(name.startswith(prefix) for prefix in stages):
+            return
+        print(f"  {name} ...", file=sys.stderr, flush=True)
+        try:
+            args = [make() for make in inputs]
+            results[name] = measure(lambda: fn(*args), iterations, warmup, items)
+        except Exception as e:
+            # e.g. a model that cannot be downloaded in an offline sandbox
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    # Every input has its own seed, so a stage sees the same data whichever stages run
+    sources = {label: partial(synthetic_jpeg, w, h, np.random.default_rng([SEED, w, h]))
+               for label, (w, h) in RESOLUTIONS.items()}
+    if fixtures_dir:
+        for name in sorted(os.listdir(fixtures_dir)):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                sources["fixture_" + os.path.splitext(name)[0]] = partial(read_file, os.path.join(fixtures_dir, name))
+    encoded, decoded = {}, {}
+
+    def jpeg(label):
+        if label not in encoded:
+            encoded[label] = sources[label]()
+        return encoded[label]
+
+    def rgb(label):
+        if label not in decoded:
+            decoded[label] = load_image(jpeg(label)).rgb
+        return decoded[label]
+
+    for label in sources:
+        bench(f"decode/full/{label}", lambda data: np.array(Image.open(io.BytesIO(data)).convert("RGB")), partial(jpeg, label))
+        bench(f"decode/ingest/{label}", load_image, partial(jpeg, label))
+        bench(f"color_conversion/{label}", lambda image: cv2.cvtColor(image, cv2.COLOR_RGB2BGR), partial(rgb, label))
+
+    pool = PoseEstimatorPool(max_size=1)
+
+    def infer(image, complexity):
+        with pool.estimator(complexity) as pose:
+            pose.process(image)
+
+    for complexity in complexities:
+        for label in sources:
+            bench(f"pose_inference/complexity_{complexity}/{label}", partial(infer, complexity=complexity), partial(rgb, label))
+    pool.close()
+
+    drawing = mp.solutions.drawing_utils
+    connections = mp.solutions.pose.POSE_CONNECTIONS
+    landmarks = synthetic_landmarks(np.random.default_rng([SEED, 1]))
+    for label in sources:
+        bench(f"draw_landmarks/{label}", lambda canvas: drawing.draw_landmarks(canvas, landmarks, connections),
+              lambda label=label: rgb(label).copy())
+
+    # What the app actually ships: display-size preview, drawn and encoded once
+    preview_landmarks = np.random.default_rng([SEED, 2]).random((33, 4), dtype=np.float32)
+    preview_metrics = {"left_hip_angle": 170.0, "left_knee_angle": 175.0}
+    for label in sources:
+        for overlay in ("raster", "vector"):
+            bench(f"render_preview/{overlay}/{label}",
+                  lambda image, overlay=overlay: render_preview(image, preview_landmarks, preview_metrics, overlay=overlay),
+                  partial(rgb, label))
+
+    rng = np.random.default_rng([SEED, 3])
+    bench("angles/single", lambda array: compute_metrics(array, (1280, 960)), lambda: rng.random((33, 4), dtype=np.float32))
+    bench("angles/batch_10k", lambda batch: compute_metrics(batch, (1280, 960)),
+          lambda: rng.random((10000, 33, 4), dtype=np.float32), iterations=max(iterations // 10, 5), items=10000)
+
+    records = partial(synthetic_responses, 10000, np.random.default_rng([SEED, 4]))
+    bench("scoring/single", lambda batch: get_risk_level(calculate_score(batch[0])), records)
+    bench("scoring/batch_10k", score_records, records, iterations=max(iterations // 10, 5), items=10000)
+
+    for level in ("Low", "Moderate", "High"):
+        bench(f"generate_report/{level.lower()}", lambda batch, level=level: generate_report(level, batch[0], 12),
+              partial(synthetic_responses, 1, np.random.default_rng([SEED, 4])))
+
+    return results
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "mediapipe": mp.__version__,
+        "pillow": Image.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current, baseline, threshold):
+    """Stages that got slower than ``threshold`` allows, and stages that ran in the baseline but fail now."""
+    regressions, failures = [], []
+    for name, stats in current["stages"].items():
+        reference = baseline["stages"].get(name)
+        if not reference or "p50_ms" not in reference:
+            continue
+        if "error" in stats:
+            failures.append((name, stats["error"]))
+            continue
+        ratio = stats["p50_ms"] / reference["p50_ms"] if reference["p50_ms"] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append((name, reference["p50_ms"], stats["p50_ms"], ratio))
+    return regressions, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the posture assessment pipeline stage by stage.")
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON results")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--complexities", default="0,1,2", help="Pose model complexities to time")
+    parser.add_argument("--fixtures", help="Directory of real photos to benchmark alongside synthetic ones")
+    parser.add_argument("--stage", action="append", help="Only run stages whose name starts with this (repeatable)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against (default: benchmarks/baseline.json if present)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown vs. baseline (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="Also write results as the new baseline")
+    args = parser.parse_args(argv)
+
+    complexities = [int(c) for c in args.complexities.split(",") if c]
+    print("Running benchmarks:", file=sys.stderr)
+    current = {
+        "environment": environment(),
+        "config": {"iterations": args.iterations, "warmup": args.warmup, "seed": SEED, "complexities": complexities},
+        "stages": run_benchmarks(args.iterations, args.warmup, complexities, args.fixtures, args.stage),
+    }
+    current["peak_rss_mb"] = float(peak_rss_mb())
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    failed = sorted(name for name, stats in current["stages"].items() if "error" in stats)
+    if args.save_baseline:
+        if failed:
+            # A baseline without e.g. the production pose models would let their regressions through
+            print(f"Not saving a baseline: {len(failed)} stages failed ({', '.join(failed)})", file=sys.stderr)
+            return 2
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    for name, stats in current["stages"].items():
+        if "error" in stats:
+            print(f"{name:45s} skipped: {stats['error']}")
+        else:
+            print(f"{name:45s} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                  f"p99 {stats['p99_ms']:9.3f} ms  {stats['throughput_per_s']:12.1f}/s")
+
+    print(f"Peak RSS: {current['peak_rss_mb']:.1f} MB")
+
+    baseline_path = args.baseline
+    if baseline_path is None and not args.save_baseline and os.path.exists(DEFAULT_BASELINE):
+        baseline_path = DEFAULT_BASELINE
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != current["environment"]:
+            print(f"Note: {baseline_path} was recorded in a different environment", file=sys.stderr)
+        regressions, failures = compare(current, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+        for name, error in failures:
+            print(f"FAILED {name}: ran in the baseline, now {error}")
+        if regressions or failures:
+            return 1
+        print(f"No stage regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
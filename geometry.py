@@ -0,0 +1,153 @@
+from functools import lru_cache
+
+import numpy as np
+
+# MediaPipe BlazePose landmark indices (fixed 33-point topology)
+NOSE = 0
+LEFT_EAR = 7
+RIGHT_EAR = 8
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+NUM_LANDMARKS = 33
+
+# Virtual midpoints appended after the 33 real landmarks, in this order
+MID_SHOULDER = 33
+MID_HIP = 34
+MIDPOINTS = (
+    (MID_SHOULDER, LEFT_SHOULDER, RIGHT_SHOULDER),
+    (MID_HIP, LEFT_HIP, RIGHT_HIP),
+)
+
+DEFAULT_MIN_VISIBILITY = 0.5
+
+# Each row is (name, kind, a, b, c):
+#   angle - unsigned angle a-b-c at b, in [0, 180]
+#   tilt  - signed angle of line a-b from horizontal, in [-90, 90), positive when its
+#           right-hand end in the image is higher
+#   lean  - signed angle of segment a->b from vertical, positive when b is further right
+METRIC_TABLE = (
+    ("left_hip_angle", "angle", LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    ("right_hip_angle", "angle", RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    ("left_knee_angle", "angle", LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    ("right_knee_angle", "angle", RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+    ("left_neck_angle", "angle", LEFT_EAR, LEFT_SHOULDER, LEFT_HIP),
+    ("right_neck_angle", "angle", RIGHT_EAR, RIGHT_SHOULDER, RIGHT_HIP),
+    ("shoulder_tilt", "tilt", LEFT_SHOULDER, RIGHT_SHOULDER, None),
+    ("hip_tilt", "tilt", LEFT_HIP, RIGHT_HIP, None),
+    ("head_tilt", "tilt", LEFT_EAR, RIGHT_EAR, None),
+    ("trunk_lean", "lean", MID_HIP, MID_SHOULDER, None),
+    ("left_forward_head", "lean", LEFT_SHOULDER, LEFT_EAR, None),
+    ("right_forward_head", "lean", RIGHT_SHOULDER, RIGHT_EAR, None),
+)
+
+# Left minus right for paired metrics
+ASYMMETRY_TABLE = (
+    ("hip_angle_asymmetry", "left_hip_angle", "right_hip_angle"),
+    ("knee_angle_asymmetry", "left_knee_angle", "right_knee_angle"),
+    ("neck_angle_asymmetry", "left_neck_angle", "right_neck_angle"),
+)
+
+
+def metric_names(table=METRIC_TABLE, asymmetries=ASYMMETRY_TABLE):
+    return tuple(row[0] for row in table) + tuple(row[0] for row in asymmetries)
+
+
+METRIC_NAMES = metric_names()
+
+
+def to_landmark_array(landmarks):
+    # One (33, 4) set or a batch of them -> float32 (N, 33, 4) of x, y, z, visibility
+    array = np.asarray(landmarks, dtype=np.float32)
+    if array.ndim == 2:
+        array = array[np.newaxis]
+    if array.shape[1:] != (NUM_LANDMARKS, 4):
+        raise ValueError(f"expected (N, {NUM_LANDMARKS}, 4) landmarks, got {array.shape}")
+    return array
+
+
+@lru_cache(maxsize=None)
+def _compile(table, asymmetries):
+    # Group table rows by kind into index arrays so each kind is a single gather
+    names = [row[0] for row in table]
+    kinds = {}
+    for column, (_, kind, a, b, c) in enumerate(table):
+        if kind not in ("angle", "tilt", "lean"):
+            raise ValueError(f"unknown metric kind {kind!r}")
+        kinds.setdefault(kind, []).append((column, a, b, b if c is None else c))
+    compiled = {
+        kind: tuple(np.array(part, dtype=np.intp) for part in zip(*rows))
+        for kind, rows in kinds.items()
+    }
+    pairs = np.array([(names.index(left), names.index(right)) for _, left, right in asymmetries],
+                     dtype=np.intp).reshape(-1, 2)
+    return compiled, pairs
+
+
+def _points(landmarks, image_sizes):
+    # x/y in pixel units (or normalized units if sizes are unknown) plus visibility,
+    # with the virtual midpoints appended
+    points = landmarks[..., :2]
+    if image_sizes is not None:
+        points = points * np.asarray(image_sizes, dtype=np.float32).reshape(-1, 1, 2)
+    visibility = landmarks[..., 3]
+
+    left = np.array([l for _, l, _ in MIDPOINTS])
+    right = np.array([r for _, _, r in MIDPOINTS])
+    points = np.concatenate([points, (points[:, left] + points[:, right]) / 2], axis=1)
+    visibility = np.concatenate([visibility, np.minimum(visibility[:, left], visibility[:, right])], axis=1)
+    return points, visibility
+
+
+def compute_metrics(landmarks, image_sizes=None, table=METRIC_TABLE, asymmetries=ASYMMETRY_TABLE):
+    """Compute every metric in ``table`` for a batch of landmark sets.
+
+    ``image_sizes`` is (width, height) per set (or one for all); when given,
+    angles are measured in pixel space so non-square images are not skewed.
+    Returns float32 ``values`` and ``confidence`` arrays of shape (N, M), where
+    confidence is the lowest visibility among the landmarks a metric uses.
+    """
+    landmarks = to_landmark_array(landmarks)
+    compiled, pairs = _compile(tuple(table), tuple(asymmetries))
+    points, visibility = _points(landmarks, image_sizes)
+
+    n = landmarks.shape[0]
+    values = np.empty((n, len(table) + len(pairs)), dtype=np.float32)
+    confidence = np.empty_like(values)
+
+    for kind, (columns, a, b, c) in compiled.items():
+        ba = points[:, a] - points[:, b]
+        if kind == "angle":
+            bc = points[:, c] - points[:, b]
+            cross = ba[..., 0] * bc[..., 1] - ba[..., 1] * bc[..., 0]
+            dot = (ba * bc).sum(axis=-1)
+            values[:, columns] = np.degrees(np.arctan2(np.abs(cross), dot))
+        elif kind == "tilt":
+            # Image y grows downwards, so flip it to make "higher" positive
+            degrees = np.degrees(np.arctan2(ba[..., 1], -ba[..., 0]))
+            values[:, columns] = (degrees + 90.0) % 180.0 - 90.0
+        else:
+            values[:, columns] = np.degrees(np.arctan2(-ba[..., 0], ba[..., 1]))
+        confidence[:, columns] = np.minimum(np.minimum(visibility[:, a], visibility[:, b]), visibility[:, c])
+
+    offset = len(table)
+    if len(pairs):
+        values[:, offset:] = values[:, pairs[:, 0]] - values[:, pairs[:, 1]]
+        confidence[:, offset:] = np.minimum(confidence[:, pairs[:, 0]], confidence[:, pairs[:, 1]])
+    return values, confidence
+
+
+def mask_low_visibility(values, confidence, min_visibility=DEFAULT_MIN_VISIBILITY):
+    # Metrics built on poorly visible landmarks become NaN rather than misleading numbers
+    return np.where(confidence >= min_visibility, values, np.float32(np.nan))
+
+
+def metrics_dict(values, names=METRIC_NAMES):
+    # One row of metric values -> {name: float or None}
+    return {name: None if np.isnan(value) else float(value) for name, value in zip(names, values)}
@@ -0,0 +1,273 @@
+"""Pose inference off the Streamlit script thread.
+
+Uploads are analyzed by a pool of local worker processes that keep warm
+estimators, so CPU-bound inference never competes with the server for the
+GIL. submit_all() returns one AnalysisFuture per image, which the UI can
+poll or wait on. Identical images share one request, finished results go to
+the shared ResultCache, and once POSE_SERVICE_MAX_PENDING requests are queued
+new ones are refused with ServiceBusy instead of piling up.
+
+Stage timings, slow-request profiles and estimator pool stats are measured in
+the workers and shipped back with each result.
+
+This module stays free of the vision imports; only the workers load them.
+"""
+
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentation
+from pose_cache import content_key, get_cache
+
+# Three workers let the front, side and back photos of one assessment run side by side
+DEFAULT_WORKERS = int(os.environ.get("POSE_SERVICE_WORKERS", str(min(3, os.cpu_count() or 1))))
+DEFAULT_MAX_PENDING = int(os.environ.get("POSE_SERVICE_MAX_PENDING", "8"))
+
+
+class ServiceBusy(RuntimeError):
+    """The request queue is full; retry in a moment."""
+
+
+def _init_worker():
+    from pose_analysis import DEFAULT_TIERS
+    from pose_pool import get_pool
+
+    # One request at a time per worker, so process CPU time covers MediaPipe's own threads
+    instrumentation.use_process_cpu_time()
+    # Load every default tier's model before the first request arrives
+    for model_complexity in DEFAULT_TIERS:
+        with get_pool().estimator(model_complexity):
+            pass
+
+
+def _worker_status():
+    from pose_pool import get_pool
+
+    return os.getpid(), get_pool().stats()
+
+
+def _ready():
+    return _worker_status()
+
+
+def _analyze(data, options):
+    from pose_analysis import analyze_image_tiered
+
+    # Profiled here, where the work runs; the server thread only waits
+    trace = instrumentation.start_trace()
+    instrumentation.slow_profiles.clear()
+    with instrumentation.profile_if_slow("image"):
+        result = analyze_image_tiered(data, **options)
+    return result, trace, list(instrumentation.slow_profiles), _worker_status()
+
+
+class AnalysisFuture(concurrent.futures.Future):
+    """Future of one image's PoseResult.
+
+    Once done, ``trace`` holds the stage timings of the worker that analyzed
+    it (empty for cache hits), for the waiting run's instrumentation trace.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.trace = []
+
+
+class InferenceService:
+    """Bounded, deduplicating front end to a pool of inference processes.
+
+    Options passed to submit_all() are forwarded to
+    pose_analysis.analyze_image_tiered and must be hashable.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = {}  # cache key -> Future shared by every caller of that image
+        self._closed = False
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.failed = 0
+        self.tier_counts = Counter()
+        self._worker_pools = {}  # worker pid -> estimator pool stats
+
+    def _executor_locked(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def start(self):
+        # Workers are spawned on demand; one no-op task each starts and warms them all now
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("inference service is shut down")
+            executor = self._executor_locked()
+            futures = [executor.submit(_ready) for _ in range(self.workers)]
+        for future in futures:
+            future.add_done_callback(self._ready_done)
+        return futures
+
+    def _ready_done(self, work):
+        if not work.cancelled() and work.exception() is None:
+            pid, pool_stats = work.result()
+            with self._lock:
+                self._worker_pools[pid] = pool_stats
+
+    def submit_all(self, images, per_image=None, **options):
+        """Submit {name: image bytes} together and return {name: AnalysisFuture}.
+
+        ``per_image`` maps a name to options that apply to that image only,
+        on top of ``options``. The images are admitted all at once or, if
+        they do not fit in the queue, not at all, so a multi-view assessment
+        never half-starts.
+        """
+        image_options = {name: dict(options, **(per_image or {}).get(name, {})) for name in images}
+        keys = {name: content_key(data, "service", tuple(sorted(image_options[name].items())))
+                for name, data in images.items()}
+        futures = {}
+        for name, key in keys.items():
+            cached = get_cache().get(key)
+            if cached is not None:
+                futures[name] = AnalysisFuture()
+                futures[name].set_result(cached)
+
+        started = []
+        try:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("inference service is shut down")
+                new_keys = {key for name, key in keys.items() if name not in futures and key not in self._pending}
+                if len(self._pending) + len(new_keys) > self.max_pending:
+                    self.rejected += 1
+                    raise ServiceBusy(f"{len(self._pending)} images are already being analyzed")
+
+                for name, key in keys.items():
+                    if name in futures:
+                        continue
+                    future = self._pending.get(key)
+                    if future is not None:
+                        self.deduplicated += 1
+                    else:
+                        future = AnalysisFuture()
+                        started.append((key, future, self._start_locked(images[name], image_options[name])))
+                        self._pending[key] = future
+                        self.submitted += 1
+                    futures[name] = future
+        finally:
+            # Outside the lock, since a finished task runs _finish right away. Also when a later
+            # submit raised: the earlier tasks still free their pending slots once they finish.
+            for key, future, work in started:
+                work.add_done_callback(lambda work, key=key, future=future: self._finish(key, future, work))
+        return futures
+
+    def _start_locked(self, data, options):
+        try:
+            return self._executor_locked().submit(_analyze, data, options)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start over with a fresh pool
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._worker_pools = {}
+            return self._executor_locked().submit(_analyze, data, options)
+
+    def _finish(self, key, future, work):
+        with self._lock:
+            self._pending.pop(key, None)
+        if work.cancelled():
+            future.cancel()
+            return
+        try:
+            result, trace, profiles, (pid, pool_stats) = work.result()
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            future.set_exception(e)
+            return
+
+        # This runs on the executor's thread, outside any script run; waiters add the trace to their own
+        instrumentation.observe(trace)
+        instrumentation.slow_profiles.extend(profiles)
+        with self._lock:
+            self.tier_counts[result.model_complexity] += 1
+            self._worker_pools[pid] = pool_stats
+        get_cache().put(key, result, result.nbytes)
+        future.trace = trace
+        future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": len(self._pending),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+
+    def pool_stats(self):
+        # Estimator pools of all workers, as of each one's last answer
+        with self._lock:
+            pools = list(self._worker_pools.values())
+        return {name: sum(pool[name] for pool in pools) for name in ("idle", "in_use", "created", "evicted")}
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """Refuse new requests and stop the workers.
+
+        With ``wait``, requests already accepted are finished first unless
+        ``cancel_pending`` is set, in which case queued ones are cancelled.
+        """
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = InferenceService()
+            atexit.register(_service.shutdown)
+        return _service
+
+
+def _collect_metrics():
+    if _service is None:
+        return
+    stats = _service.stats()
+    yield "posture_service_pending", "gauge", "Images queued or being analyzed.", stats["pending"], {}
+    yield "posture_service_submitted_total", "counter", "Images sent to inference workers.", stats["submitted"], {}
+    yield "posture_service_deduplicated_total", "counter", "Requests joined to an identical one in flight.", stats["deduplicated"], {}
+    yield "posture_service_rejected_total", "counter", "Requests refused because the queue was full.", stats["rejected"], {}
+    yield "posture_service_failed_total", "counter", "Inference requests that raised.", stats["failed"], {}
+    pool = _service.pool_stats()
+    yield "posture_service_pool_estimators", "gauge", "Pose estimators in the workers' pools.", pool["idle"], {"state": "idle"}
+    yield "posture_service_pool_estimators", "gauge", "Pose estimators in the workers' pools.", pool["in_use"], {"state": "in_use"}
+    yield "posture_service_pool_created_total", "counter", "Pose estimators created by the workers.", pool["created"], {}
+    yield "posture_service_pool_evicted_total", "counter", "Idle pose estimators closed by the workers.", pool["evicted"], {}
+    with _service._lock:
+        counts = dict(_service.tier_counts)
+    for model_complexity, count in sorted(counts.items()):
+        yield ("posture_service_tier_answers_total", "counter", "Images answered per model complexity.",
+               count, {"model_complexity": model_complexity})
+
+
+instrumentation.register_collector(_collect_metrics)
@@ -0,0 +1,65 @@
+import io
+import os
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Pose models run at 256px internally, so decoding beyond this only costs memory
+DEFAULT_MAX_EDGE = int(os.environ.get("POSE_INPUT_MAX_EDGE", "1280"))
+
+EXIF_ORIENTATION = 0x0112
+EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+@dataclass
+class IngestedImage:
+    # C-contiguous uint8 RGB buffer at inference resolution
+    rgb: np.ndarray
+    # (width, height) of the upright full-resolution image
+    original_size: tuple
+
+
+def load_image(data, max_edge=DEFAULT_MAX_EDGE):
+    image = Image.open(io.BytesIO(data))
+
+    # Size of the upright image, known from the header without decoding pixels
+    orientation = image.getexif().get(EXIF_ORIENTATION)
+    width, height = image.size
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+
+    scale = max_edge / max(width, height) if max_edge else 1.0
+    if scale < 1:
+        # Let the JPEG decoder do DCT scaling straight to (at least) the target size. draft() takes
+        # the size in stored orientation and only scales when both sides still cover the request.
+        image.draft("RGB", (round(image.size[0] * scale), round(image.size[1] * scale)))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if scale < 1:
+        # Formats without draft support (PNG) get a cheap integer box reduction
+        factor = max(image.size) // max_edge
+        if factor >= 2:
+            image = image.reduce(factor)
+
+    # Only rotate when the EXIF tag asks for it; exif_transpose copies even when it is a no-op
+    if orientation in EXIF_TRANSPOSE:
+        image = image.transpose(EXIF_TRANSPOSE[orientation])
+
+    if scale < 1:
+        # The remaining reduction is under 2x, where a bilinear resize is both fast and clean
+        rgb = cv2.resize(np.asarray(image), (round(width * scale), round(height * scale)),
+                         interpolation=cv2.INTER_LINEAR)
+    else:
+        # One writable, contiguous buffer shared by inference and the overlay
+        rgb = np.array(image)
+    return IngestedImage(rgb, (width, height))
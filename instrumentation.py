@@ -0,0 +1,277 @@
+"""Per-stage timing, Prometheus metrics and slow-request profiling.
+
+Everything is off unless asked for:
+
+- POSTURE_METRICS=1 records every stage into latency histograms.
+- POSTURE_METRICS_PORT serves them at http://127.0.0.1:<port>/metrics and
+  POSTURE_METRICS_FILE rewrites a Prometheus text file after each request.
+- POSTURE_PROFILE_SLOW_MS samples the stack of requests and keeps the profile
+  of any that run longer than this many milliseconds.
+- POSTURE_TRACE_ALLOC=1 also records bytes allocated per stage (tracemalloc
+  slows everything down noticeably, so only for investigations).
+
+A per-run trace for the app's debug panel can be started with start_trace()
+regardless of these settings. When nothing is enabled, stage() returns a
+shared no-op context manager.
+
+Stage CPU time is the calling thread's, which is right for a server running
+many sessions but misses work done on native threads. Processes that handle
+one request at a time, like the inference workers, call
+use_process_cpu_time() so MediaPipe's graph threads are counted too.
+"""
+
+import collections
+import contextvars
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, Prometheus style
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+enabled = os.environ.get("POSTURE_METRICS", "") not in ("", "0")
+trace_allocations = os.environ.get("POSTURE_TRACE_ALLOC", "") not in ("", "0")
+slow_request_seconds = float(os.environ.get("POSTURE_PROFILE_SLOW_MS", "0")) / 1000 or None
+metrics_file = os.environ.get("POSTURE_METRICS_FILE")
+profile_dir = os.environ.get("POSTURE_PROFILE_DIR", tempfile.gettempdir())
+
+_NOOP = nullcontext()
+_trace = contextvars.ContextVar("posture_trace", default=None)
+_lock = threading.Lock()
+_histograms = {}  # stage -> [bucket counts..., +Inf count, sum, cpu sum, alloc sum]
+_collectors = []
+slow_profiles = collections.deque(maxlen=5)
+_cpu_clock = time.thread_time
+
+
+def enable(allocations=False):
+    global enabled, trace_allocations
+    enabled = True
+    trace_allocations = allocations
+    if allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def use_process_cpu_time():
+    # Only for processes that run one request at a time; otherwise stages would share each other's CPU
+    global _cpu_clock
+    _cpu_clock = time.process_time
+
+
+def start_trace():
+    # Stages run later in this context (script run) are appended to the returned list
+    trace = []
+    _trace.set(trace)
+    return trace
+
+
+def stage(name):
+    if not enabled and _trace.get() is None:
+        return _NOOP
+    return _timed(name)
+
+
+@contextmanager
+def _timed(name):
+    alloc_before = tracemalloc.get_traced_memory()[0] if trace_allocations and tracemalloc.is_tracing() else None
+    cpu_started = _cpu_clock()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - started
+        cpu = _cpu_clock() - cpu_started
+        allocated = None
+        if alloc_before is not None:
+            allocated = max(tracemalloc.get_traced_memory()[0] - alloc_before, 0)
+        record(name, wall, cpu, allocated)
+
+
+def record(name, wall, cpu, allocated=None):
+    trace = _trace.get()
+    if trace is not None:
+        trace.append({"stage": name, "wall_ms": wall * 1000, "cpu_ms": cpu * 1000, "allocated_bytes": allocated})
+    if enabled:
+        _observe(name, wall, cpu, allocated or 0)
+
+
+def observe(entries):
+    # Trace entries timed in another process (an inference worker), counted once into the histograms
+    if enabled:
+        for entry in entries:
+            _observe(entry["stage"], entry["wall_ms"] / 1000, entry["cpu_ms"] / 1000, entry["allocated_bytes"] or 0)
+
+
+def extend_trace(entries):
+    # Add those entries to the trace of the run that waited for them
+    trace = _trace.get()
+    if trace is not None:
+        trace.extend(entries)
+
+
+def _observe(name, wall, cpu, allocated):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = [0] * (len(BUCKETS) + 1) + [0.0, 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if wall <= bound:
+                histogram[i] += 1
+        histogram[len(BUCKETS)] += 1
+        histogram[-3] += wall
+        histogram[-2] += cpu
+        histogram[-1] += allocated
+
+
+def register_collector(collect):
+    """Add a callable returning (name, type, help, value, labels) samples.
+
+    Modules that own counters (estimator pool, result cache, ...) register
+    one so the exposition does not have to import them.
+    """
+    _collectors.append(collect)
+
+
+def render_prometheus():
+    lines = [
+        "# HELP posture_stage_seconds Wall time per pipeline stage.",
+        "# TYPE posture_stage_seconds histogram",
+    ]
+    with _lock:
+        snapshot = {name: list(values) for name, values in _histograms.items()}
+    for name, values in sorted(snapshot.items()):
+        for bound, count in zip(BUCKETS, values):
+            lines.append(f'posture_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+        lines.append(f'posture_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {values[len(BUCKETS)]}')
+        lines.append(f'posture_stage_seconds_sum{{stage="{name}"}} {values[-3]}')
+        lines.append(f'posture_stage_seconds_count{{stage="{name}"}} {values[len(BUCKETS)]}')
+
+    lines.append("# HELP posture_stage_cpu_seconds_total CPU time per pipeline stage.")
+    lines.append("# TYPE posture_stage_cpu_seconds_total counter")
+    for name, values in sorted(snapshot.items()):
+        lines.append(f'posture_stage_cpu_seconds_total{{stage="{name}"}} {values[-2]}')
+    if trace_allocations:
+        lines.append("# HELP posture_stage_allocated_bytes_total Bytes allocated per pipeline stage.")
+        lines.append("# TYPE posture_stage_allocated_bytes_total counter")
+        for name, values in sorted(snapshot.items()):
+            lines.append(f'posture_stage_allocated_bytes_total{{stage="{name}"}} {values[-1]}')
+
+    seen = set()
+    for collect in _collectors:
+        for name, kind, help_text, value, labels in collect():
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    path = path or metrics_file
+    if not path:
+        return
+    # Write then rename so a scraper never reads a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port=None):
+    # Idempotent: every Streamlit rerun may call this, only the first one binds
+    global _server
+    port = port or int(os.environ.get("POSTURE_METRICS_PORT", "0"))
+    with _lock:
+        if _server is not None or not port:
+            return _server
+        _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, thread_id, interval):
+        super().__init__(name="slow-request-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+@contextmanager
+def profile_if_slow(name, threshold=None, interval=0.005):
+    """Sample the calling thread's stack and keep the profile only if slow.
+
+    Profiles are collapsed stacks (one "frame;frame;frame count" per line, the
+    input format of flamegraph tools), kept in ``slow_profiles`` and written
+    to POSTURE_PROFILE_DIR.
+    """
+    threshold = threshold if threshold is not None else slow_request_seconds
+    if not threshold:
+        yield
+        return
+
+    sampler = _Sampler(threading.get_ident(), interval)
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        sampler.done.set()
+        sampler.join()
+        if elapsed >= threshold and sampler.stacks:
+            collapsed = "\n".join(f"{stack} {count}" for stack, count in sampler.stacks.most_common())
+            path = os.path.join(profile_dir, f"posture-slow-{name}-{int(time.time() * 1000)}.folded")
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(collapsed + "\n")
+            except OSError:
+                path = None
+            slow_profiles.append({"name": name, "seconds": elapsed, "path": path, "collapsed": collapsed})
+
+
+if trace_allocations and not tracemalloc.is_tracing():
+    tracemalloc.start()
@@ -0,0 +1,84 @@
+"""Combine front, side and back photos of one assessment.
+
+Each view is analyzed on its own (see inference_service.submit_all); this
+module merges the per-view metrics. Left/right tilts come from the coronal
+views, averaged when both are present, and every other metric from the side
+view. Tilts are reported from the subject's point of view: positive when
+their left side is higher.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from geometry import (LEFT_EAR, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, METRIC_NAMES, RIGHT_EAR, RIGHT_HIP,
+                      RIGHT_SHOULDER)
+
+VIEWS = ("front", "side", "back")
+CORONAL_METRICS = ("shoulder_tilt", "hip_tilt", "head_tilt")
+# Landmarks a view's measurements need; a cheap model tier is only trusted when it sees them all
+CORONAL_LANDMARKS = (LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP, LEFT_EAR, RIGHT_EAR)
+REQUIRED_LANDMARKS = {
+    "side": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "front": CORONAL_LANDMARKS,
+    "back": CORONAL_LANDMARKS,
+}
+# Facing the camera the subject's left is on the image's right; from behind it is on the left
+CORONAL_SIGN = {"front": 1.0, "back": -1.0}
+
+
+@dataclass
+class MultiViewResult:
+    # view name -> PoseResult, for the views that were uploaded
+    views: dict
+    # geometry.METRIC_NAMES -> degrees, None where no view measured it
+    metrics: dict
+
+    @property
+    def hip_angle(self):
+        side = self.views.get("side")
+        return side.hip_angle if side is not None else None
+
+    @property
+    def landmarks(self):
+        side = self.views.get("side")
+        return side.landmarks if side is not None else None
+
+    @property
+    def model_complexity(self):
+        side = self.views.get("side")
+        return side.model_complexity if side is not None else None
+
+
+def _metric(result, name):
+    if result is None or result.metrics is None:
+        return None
+    return result.metrics.get(name)
+
+
+def combine_views(results):
+    """Merge {view: PoseResult or None} into a MultiViewResult."""
+    views = {view: result for view, result in results.items() if result is not None}
+    metrics = {}
+    for name in METRIC_NAMES:
+        if name in CORONAL_METRICS:
+            values = [CORONAL_SIGN[view] * value for view in CORONAL_SIGN
+                      if (value := _metric(views.get(view), name)) is not None]
+            metrics[name] = float(np.mean(values)) if values else None
+        else:
+            metrics[name] = _metric(views.get("side"), name)
+    return MultiViewResult(views, metrics)
+
+
+def scoring_fields(result: Optional[MultiViewResult]):
+    # Response fields the scoring rules read; tilts are scored by magnitude
+    fields = {"hip_angle": None}
+    fields.update((name, None) for name in CORONAL_METRICS)
+    if result is None:
+        return fields
+    fields["hip_angle"] = result.hip_angle
+    for name in CORONAL_METRICS:
+        value = result.metrics.get(name)
+        fields[name] = abs(value) if value is not None else None
+    return fields
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+import instrumentation
+from geometry import LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, METRIC_NAMES, compute_metrics, mask_low_visibility, metrics_dict
+from ingest import DEFAULT_MAX_EDGE, load_image
+from pose_pool import get_pool
+from pose_result import PoseResult
+from preview import render_preview
+
+# Model complexities tried in order until the required landmarks are confidently visible
+DEFAULT_TIERS = tuple(int(c) for c in os.environ.get("POSE_TIERS", "0,2").split(","))
+DEFAULT_TIER_MIN_VISIBILITY = float(os.environ.get("POSE_TIER_MIN_VISIBILITY", "0.7"))
+
+# Landmarks the hip angle is measured from
+REQUIRED_LANDMARKS = (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)
+
+_tier_lock = threading.Lock()
+# Moving average of inference seconds per model complexity, for the latency budget
+_tier_seconds = {}
+
+
+def landmarks_to_array(pose_landmarks):
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+        dtype=np.float32,
+    )
+
+
+def _estimate(image, model_complexity, enable_segmentation):
+    # Perform pose estimation with a warm estimator from the shared pool
+    started = time.perf_counter()
+    with instrumentation.stage(f"inference_c{model_complexity}"):
+        with get_pool().estimator(model_complexity, enable_segmentation) as pose:
+            results = pose.process(image.rgb)
+    elapsed = time.perf_counter() - started
+
+    with _tier_lock:
+        previous = _tier_seconds.get(model_complexity)
+        _tier_seconds[model_complexity] = elapsed if previous is None else 0.9 * previous + 0.1 * elapsed
+    return results.pose_landmarks
+
+
+def _build_result(image, pose_landmarks, model_complexity):
+    if not pose_landmarks:
+        return PoseResult(None, None, None, image.original_size, model_complexity=model_complexity)
+
+    with instrumentation.stage("metrics"):
+        landmarks = landmarks_to_array(pose_landmarks)
+
+        # All posture metrics in one vectorized pass, measured in pixel space
+        values, confidence = compute_metrics(landmarks, image.original_size)
+        metrics = metrics_dict(mask_low_visibility(values, confidence)[0])
+
+    # For side view, one side of the body may be more visible.
+    # The hip angle (shoulder, hip, knee) uses the left side, whatever its visibility.
+    hip_angle = float(values[0, METRIC_NAMES.index("left_hip_angle")])
+
+    # Draw and encode at display size only; the full buffer is never annotated or shipped
+    with instrumentation.stage("render"):
+        preview = render_preview(image.rgb, landmarks, metrics)
+
+    return PoseResult(landmarks, preview, hip_angle, image.original_size, metrics, model_complexity)
+
+
+def _required_visibility(pose_landmarks, required_landmarks):
+    if not pose_landmarks:
+        return -1.0
+    return min(pose_landmarks.landmark[i].visibility for i in required_landmarks)
+
+
+def analyze_image_tiered(data, tiers=DEFAULT_TIERS, enable_segmentation=False, max_edge=DEFAULT_MAX_EDGE,
+                         min_visibility=DEFAULT_TIER_MIN_VISIBILITY, latency_budget=None,
+                         required_landmarks=REQUIRED_LANDMARKS):
+    """Run the cheapest model first and escalate only when it is not confident.
+
+    Each tier in ``tiers`` is a model complexity. A tier's answer is accepted
+    when every landmark in ``required_landmarks`` (by default those of the
+    side-view hip angle) has at least ``min_visibility``.
+    With ``latency_budget`` (seconds), a tier is skipped when its typical
+    inference time would overrun the budget, and the best answer so far is kept.
+    """
+    started = time.perf_counter()
+    # Decode straight to inference resolution as an upright RGB buffer
+    with instrumentation.stage("decode"):
+        image = load_image(data, max_edge)
+
+    best, best_visibility, best_tier = None, -1.0, tiers[0]
+    for index, model_complexity in enumerate(tiers):
+        if index and latency_budget is not None:
+            expected = _tier_seconds.get(model_complexity, 0.0)
+            if time.perf_counter() - started + expected > latency_budget:
+                break
+
+        pose_landmarks = _estimate(image, model_complexity, enable_segmentation)
+        visibility = _required_visibility(pose_landmarks, required_landmarks)
+        # A later tier only replaces an earlier answer when it is at least as confident
+        if visibility >= best_visibility:
+            best, best_visibility, best_tier = pose_landmarks, visibility, model_complexity
+        if visibility >= min_visibility:
+            break
+
+    return _build_result(image, best, best_tier)
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import instrumentation
+
+DEFAULT_MAX_BYTES = int(os.environ.get("POSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DEFAULT_TTL = float(os.environ.get("POSE_CACHE_TTL", "3600"))
+
+
+def content_key(data, *params):
+    # Identical uploads share an entry regardless of file name or session
+    digest = hashlib.sha256(data).hexdigest()
+    return (digest,) + params
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by total size in bytes, with TTL expiry.
+
+    Values are stored together with their size, supplied by the caller, so
+    the cache never has to inspect them.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, nbytes, stored_at)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop_locked(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self.current_bytes -= nbytes
+        self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl:
+                self._drop_locked(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        if nbytes > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                _, old_bytes, _ = self._entries.pop(key)
+                self.current_bytes -= old_bytes
+            self._entries[key] = (value, nbytes, now)
+            self.current_bytes += nbytes
+
+            # Expired entries go first, then least recently used ones
+            for old_key in [k for k, (_, _, stored_at) in self._entries.items() if now - stored_at > self.ttl]:
+                self._drop_locked(old_key)
+            while self.current_bytes > self.max_bytes:
+                self._drop_locked(next(iter(self._entries)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def _collect_metrics():
+    if _cache is None:
+        return
+    cache = _cache.stats()
+    yield "posture_cache_entries", "gauge", "Cached pose results.", cache["entries"], {}
+    yield "posture_cache_bytes", "gauge", "Bytes held by cached pose results.", cache["bytes"], {}
+    yield "posture_cache_hits_total", "counter", "Pose result cache hits.", cache["hits"], {}
+    yield "posture_cache_misses_total", "counter", "Pose result cache misses.", cache["misses"], {}
+    yield "posture_cache_evictions_total", "counter", "Pose results evicted from the cache.", cache["evictions"], {}
+
+
+instrumentation.register_collector(_collect_metrics)
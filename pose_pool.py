@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mediapipe as mp
+
+import instrumentation
+
+DEFAULT_POOL_SIZE = int(os.environ.get("POSE_POOL_SIZE", "2"))
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get("POSE_POOL_IDLE_TIMEOUT", "600"))
+
+
+class PoseEstimatorPool:
+    """Thread-safe pool of reusable MediaPipe Pose estimators.
+
+    Estimators are keyed by (model_complexity, enable_segmentation). At most
+    ``max_size`` estimators exist per key; callers block until one is free.
+    Estimators idle for longer than ``idle_timeout`` seconds are closed, by
+    a timer when the pool sees no traffic.
+    """
+
+    def __init__(self, max_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._idle = {}  # key -> list of (estimator, last_used)
+        self._in_use = {}  # key -> number of checked out estimators
+        self._reaper = None
+        self.created = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _create(key):
+        model_complexity, enable_segmentation = key
+        return mp.solutions.pose.Pose(
+            static_image_mode=True,
+            model_complexity=model_complexity,
+            enable_segmentation=enable_segmentation,
+        )
+
+    def _evict_idle_locked(self, now):
+        expired = []
+        for key, idle in self._idle.items():
+            keep = []
+            for estimator, last_used in idle:
+                if now - last_used > self.idle_timeout:
+                    expired.append(estimator)
+                else:
+                    keep.append((estimator, last_used))
+            self._idle[key] = keep
+        self.evicted += len(expired)
+        return expired
+
+    def _schedule_reap_locked(self):
+        # Wake up when the longest-idle estimator expires; checkouts alone never evict in a quiet pool
+        if self._reaper is not None:
+            return
+        oldest = min((last_used for idle in self._idle.values() for _, last_used in idle), default=None)
+        if oldest is None:
+            return
+        delay = max(oldest + self.idle_timeout - time.monotonic(), 0) + 0.01
+        self._reaper = threading.Timer(delay, self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self):
+        with self._cond:
+            self._reaper = None
+            expired = self._evict_idle_locked(time.monotonic())
+            self._schedule_reap_locked()
+        for stale in expired:
+            stale.close()
+
+    def checkout(self, model_complexity=2, enable_segmentation=False, timeout=None):
+        key = (model_complexity, enable_segmentation)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            expired = self._evict_idle_locked(time.monotonic())
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    estimator, _ = idle.pop()
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                if self._in_use.get(key, 0) < self.max_size:
+                    # Reserve the slot now, build the estimator outside the lock
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    estimator = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No pose estimator available for {key}")
+                self._cond.wait(remaining)
+
+        for stale in expired:
+            stale.close()
+
+        if estimator is None:
+            try:
+                estimator = self._create(key)
+            except Exception:
+                with self._cond:
+                    self._in_use[key] -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.created += 1
+        return estimator
+
+    def checkin(self, estimator, model_complexity=2, enable_segmentation=False, discard=False):
+        key = (model_complexity, enable_segmentation)
+        with self._cond:
+            self._in_use[key] -= 1
+            if not discard:
+                self._idle.setdefault(key, []).append((estimator, time.monotonic()))
+            expired = self._evict_idle_locked(time.monotonic())
+            self._schedule_reap_locked()
+            self._cond.notify()
+        if discard:
+            expired.append(estimator)
+        for stale in expired:
+            stale.close()
+
+    @contextmanager
+    def estimator(self, model_complexity=2, enable_segmentation=False, timeout=None):
+        pose = self.checkout(model_complexity, enable_segmentation, timeout)
+        try:
+            yield pose
+        except BaseException:
+            # A failed graph run may leave the estimator in a bad state
+            self.checkin(pose, model_complexity, enable_segmentation, discard=True)
+            raise
+        else:
+            self.checkin(pose, model_complexity, enable_segmentation)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "in_use": sum(self._in_use.values()),
+                "created": self.created,
+                "evicted": self.evicted,
+            }
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, {}
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+        for entries in idle.values():
+            for estimator, _ in entries:
+                estimator.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PoseEstimatorPool()
+        return _pool
+
+
+def _collect_metrics():
+    if _pool is None:
+        return
+    pool = _pool.stats()
+    yield "posture_pool_estimators", "gauge", "Pose estimators in the pool.", pool["idle"], {"state": "idle"}
+    yield "posture_pool_estimators", "gauge", "Pose estimators in the pool.", pool["in_use"], {"state": "in_use"}
+    yield "posture_pool_created_total", "counter", "Pose estimators created.", pool["created"], {}
+    yield "posture_pool_evicted_total", "counter", "Idle pose estimators closed.", pool["evicted"], {}
+
+
+instrumentation.register_collector(_collect_metrics)
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class Preview:
+    # Annotated display-size image, encoded once
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    # SVG of the skeleton over the image (vector overlay mode), drawn by the browser
+    overlay: Optional[str] = None
+
+    @property
+    def nbytes(self):
+        return len(self.data) + (len(self.overlay) if self.overlay else 0)
+
+
+@dataclass
+class PoseResult:
+    # (33, 4) float32 array of normalized x, y, z and visibility, or None
+    landmarks: Optional[np.ndarray]
+    preview: Optional[Preview]
+    hip_angle: Optional[float]
+    # (width, height) of the upright original upload, the pixel space metrics are measured in
+    image_size: Optional[tuple] = None
+    # geometry.METRIC_NAMES -> degrees, None where the landmarks were not visible enough
+    metrics: Optional[dict] = None
+    # Model complexity whose output this is
+    model_complexity: Optional[int] = None
+
+    @property
+    def nbytes(self):
+        size = 128
+        if self.landmarks is not None:
+            size += self.landmarks.nbytes
+        if self.preview is not None:
+            size += self.preview.nbytes
+        if self.metrics is not None:
+            size += 64 * len(self.metrics)
+        return size
@@ -0,0 +1,121 @@
+"""Display-size annotated previews of analyzed photos.
+
+The skeleton and angle labels are drawn on a copy downscaled to the width
+the app shows, and the result is encoded once. JPEG previews no wider than
+the display width are served by Streamlit as-is. With
+POSE_PREVIEW_OVERLAY=vector the photo is encoded without drawing and the
+skeleton is sent as SVG on top of it, for the browser to render at any zoom.
+"""
+
+import base64
+import os
+
+import cv2
+import mediapipe as mp
+from mediapipe.framework.formats import landmark_pb2
+
+from geometry import DEFAULT_MIN_VISIBILITY, METRIC_TABLE
+from pose_result import Preview
+
+PREVIEW_WIDTH = int(os.environ.get("POSE_PREVIEW_WIDTH", "400"))
+PREVIEW_FORMAT = os.environ.get("POSE_PREVIEW_FORMAT", "JPEG").upper()
+PREVIEW_QUALITY = int(os.environ.get("POSE_PREVIEW_QUALITY", "80"))
+PREVIEW_OVERLAY = os.environ.get("POSE_PREVIEW_OVERLAY", "raster")
+
+ENCODINGS = {
+    "JPEG": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "WEBP": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+# Angle metrics are labelled at their vertex landmark
+ANGLE_VERTICES = {name: b for name, kind, a, b, c in METRIC_TABLE if kind == "angle"}
+
+mp_drawing = mp.solutions.drawing_utils
+mp_pose = mp.solutions.pose
+
+
+def to_landmark_list(landmarks):
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in landmarks:
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmark_list
+
+
+def _angle_labels(landmarks, metrics, width, height):
+    # (x, y, text) in pixels for every angle that was measured
+    labels = []
+    for name, vertex in ANGLE_VERTICES.items():
+        value = (metrics or {}).get(name)
+        if value is not None:
+            x, y = landmarks[vertex, 0] * width, landmarks[vertex, 1] * height
+            labels.append((int(x) + 6, int(y) - 6, f"{value:.0f}"))
+    return labels
+
+
+def encode_image(rgb, image_format=PREVIEW_FORMAT, quality=PREVIEW_QUALITY):
+    extension, mime_type, quality_flag = ENCODINGS[image_format]
+    ok, buffer = cv2.imencode(extension, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), [quality_flag, quality])
+    if not ok:
+        raise ValueError(f"could not encode preview as {image_format}")
+    return buffer.tobytes(), mime_type
+
+
+def _overlay_svg(data, mime_type, width, height, landmarks, labels, min_visibility):
+    # Colors as rgb(): a '#' would end the data: URL Streamlit wraps the SVG in
+    image = base64.b64encode(data).decode("ascii")
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<image href="data:{mime_type};base64,{image}" width="{width}" height="{height}"/>',
+    ]
+    points = landmarks[:, :2] * (width, height)
+    visible = landmarks[:, 3] >= min_visibility
+    for a, b in sorted(mp_pose.POSE_CONNECTIONS):
+        if visible[a] and visible[b]:
+            (x1, y1), (x2, y2) = points[a], points[b]
+            parts.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+                         f'stroke="rgb(255,255,255)" stroke-width="2"/>')
+    for x, y in points[visible]:
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3" fill="rgb(255,0,0)"/>')
+    for x, y, text in labels:
+        parts.append(f'<text x="{x}" y="{y}" fill="rgb(255,255,0)" font-size="14" font-family="sans-serif">{text}°</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _downscale(rgb, width, height):
+    # Exact halvings with INTER_LINEAR average 2x2 blocks, which is area-quality
+    # filtering at a fraction of INTER_AREA's cost for non-integer factors
+    while rgb.shape[1] >= 2 * width:
+        rgb = cv2.resize(rgb, (rgb.shape[1] // 2, rgb.shape[0] // 2), interpolation=cv2.INTER_LINEAR)
+    return cv2.resize(rgb, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def render_preview(rgb, landmarks, metrics=None, width=PREVIEW_WIDTH, image_format=PREVIEW_FORMAT,
+                   quality=PREVIEW_QUALITY, overlay=PREVIEW_OVERLAY, min_visibility=DEFAULT_MIN_VISIBILITY):
+    """Encode a display-size preview of ``rgb`` with the pose drawn on it.
+
+    ``landmarks`` is a normalized (33, 4) array and ``metrics`` the
+    METRIC_NAMES dict whose angles are labelled. ``rgb`` is not modified.
+    """
+    height, original_width = rgb.shape[:2]
+    if original_width > width:
+        height = round(height * width / original_width)
+        canvas = _downscale(rgb, width, height)
+    else:
+        width = original_width
+        canvas = rgb.copy()
+
+    labels = _angle_labels(landmarks, metrics, width, height) if landmarks is not None else []
+    if overlay == "vector":
+        data, mime_type = encode_image(canvas, image_format, quality)
+        svg = None
+        if landmarks is not None:
+            svg = _overlay_svg(data, mime_type, width, height, landmarks, labels, min_visibility)
+        return Preview(data, mime_type, width, height, svg)
+
+    if landmarks is not None:
+        mp_drawing.draw_landmarks(canvas, to_landmark_list(landmarks), mp_pose.POSE_CONNECTIONS)
+        for x, y, text in labels:
+            cv2.putText(canvas, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1, cv2.LINE_AA)
+    data, mime_type = encode_image(canvas, image_format, quality)
+    return Preview(data, mime_type, width, height)
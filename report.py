@@ -0,0 +1,69 @@
+def generate_report(risk_level, responses, score):
+    report = f"""
+**Posture and Scoliosis Assessment Report**
+
+**Risk Level:** {risk_level}
+
+**Total Score:** {score}
+
+---
+
+**Summary of Findings:**
+"""
+    if risk_level == "High":
+        report += "You are at high risk for posture-related issues or scoliosis. It is strongly recommended to consult a healthcare professional for a comprehensive evaluation.\n"
+    elif risk_level == "Moderate":
+        report += "You are at moderate risk for posture-related issues. Consider taking proactive steps to improve your posture and reduce risk factors.\n"
+    else:
+        report += "You are at low risk for posture-related issues. Continue maintaining good posture habits to sustain your spinal health.\n"
+
+    report += "\n---\n\n**Recommendations:**\n"
+
+    if risk_level == "Low":
+        report += """
+- **Maintain Good Posture:** Continue being mindful of your posture during daily activities.
+- **Regular Exercise:** Incorporate stretching and strengthening exercises to support spinal health.
+- **Ergonomic Practices:** Ensure your workspace remains ergonomic to prevent future issues.
+"""
+    elif risk_level == "Moderate":
+        report += """
+- **Posture Improvement Exercises:** Start specific exercises to enhance your posture.
+- **Ergonomic Adjustments:** Reevaluate and adjust your workspace setup for better ergonomics.
+- **Reduce Screen Time:** Take regular breaks to move and stretch during prolonged sitting periods.
+"""
+    elif risk_level == "High":
+        report += """
+- **Consult a Healthcare Professional:** Seek professional medical advice for a comprehensive evaluation.
+- **Targeted Physical Therapy:** Begin physical therapy exercises as recommended by a professional.
+- **Lifestyle Adjustments:** Implement significant ergonomic and lifestyle changes to support spinal health.
+"""
+
+    report += "\n---\n\n**Safe Exercises Suggestions:**\n"
+    if risk_level in ["Moderate", "High"]:
+        report += """
+**Stretching Exercises:**
+- **Neck Stretch:** Gently tilt your head towards each shoulder. Hold for 15 seconds on each side.
+- **Chest Stretch:** Clasp your hands behind your back and gently lift your arms to stretch the chest muscles.
+
+**Strengthening Exercises:**
+- **Planks:** Strengthen your core muscles by holding a plank position for 20-30 seconds. Gradually increase the duration.
+- **Bridges:** Strengthen your lower back and glutes by lying on your back with knees bent and lifting your hips off the ground.
+
+**Postural Awareness:**
+- **Wall Angels:** Stand against a wall and move your arms up and down to improve shoulder alignment.
+- **Seated Posture Correction:** Regularly check and adjust your sitting posture to maintain spinal alignment.
+
+*Note: Perform all exercises slowly and stop if you experience any pain. Consult with a healthcare professional before starting any new exercise regimen.*
+"""
+
+    report += "\n---\n\n**Lifestyle Recommendations:**\n"
+    if risk_level in ["Moderate", "High"]:
+        report += """
+- **Ergonomic Adjustments:** Set up your workspace to promote good posture, including chair and desk height adjustments.
+- **Movement Breaks:** Take short breaks every 30 minutes to stand, stretch, and move around.
+- **Mindfulness Practices:** Incorporate activities like yoga or tai chi to enhance body awareness and posture.
+"""
+
+    report += "\n---\n\n**Disclaimer:** This report provides general information and is not a substitute for professional medical diagnosis or treatment. If you suspect you have scoliosis or any serious posture-related issues, please consult a healthcare professional."
+
+    return report
@@ -0,0 +1,178 @@
+from collections import namedtuple
+
+import numpy as np
+
+HIP_ANGLE_THRESHOLD = 165
+# Degrees of measured frontal-plane tilt (front/back photos) that count as uneven
+SHOULDER_TILT_THRESHOLD = 3
+HIP_TILT_THRESHOLD = 3
+HEAD_TILT_THRESHOLD = 4
+
+# A rule adds ``weight`` to the score when ``field <op> operand`` holds, and, if
+# ``when`` is given as (field, op, operand), only when that condition holds too.
+Rule = namedtuple("Rule", "name field op operand weight when", defaults=(None,))
+
+PAIN = ("pain_present", "eq", "Yes")
+
+RULES = (
+    # Symptom assessment
+    Rule("pain", "pain_present", "eq", "Yes", 2),
+    Rule("severe_pain", "pain_severity", "ge", 7, 2, PAIN),
+    Rule("moderate_pain", "pain_severity", "range", (4, 7), 1, PAIN),
+    Rule("chronic_pain", "pain_duration", "in", ("6 months to a year", "Over a year"), 2, PAIN),
+    Rule("sudden_onset", "symptom_onset", "eq", "Suddenly", 1, PAIN),
+    Rule("activity_related_pain", "activity_related_pain", "eq", "Yes", 1, PAIN),
+    # Medical and personal history
+    Rule("previous_diagnosis", "previous_diagnosis", "eq", "Yes", 3),
+    Rule("family_history", "family_history", "eq", "Yes", 2),
+    Rule("past_injuries", "past_injuries", "eq", "Yes", 1),
+    Rule("low_activity", "physical_activity_level", "in", ("Sedentary", "Lightly active"), 1),
+    # Lifestyle and ergonomics
+    Rule("screen_time", "screen_time", "gt", 6, 1),
+    Rule("low_posture_awareness", "posture_awareness", "lt", 5, 1),
+    Rule("no_ergonomic_setup", "ergonomic_setup", "eq", "No", 1),
+    Rule("stomach_sleeping", "sleeping_position", "eq", "Stomach", 1),
+    # Physical assessment indicators
+    Rule("uneven_shoulders", "shoulder_alignment", "eq", "Yes", 2),
+    Rule("head_tilt", "head_alignment", "eq", "Yes", 2),
+    Rule("spinal_curvature", "spinal_curvature", "eq", "Yes", 3),
+    Rule("uneven_hips", "hip_level", "eq", "No", 2),
+    Rule("foot_rotation", "foot_alignment", "ne", "Straight", 1),
+    Rule("uneven_clothes_fit", "clothes_fit", "eq", "Yes", 1),
+    # Functional assessments
+    Rule("reduced_mobility", "mobility", "eq", "Yes", 2),
+    Rule("fatigue", "fatigue", "eq", "Yes", 1),
+    Rule("breathing", "breathing", "eq", "Yes", 1),
+    Rule("balance_issues", "balance_issues", "eq", "Yes", 1),
+    # Image analysis
+    Rule("closed_hip_angle", "hip_angle", "lt", HIP_ANGLE_THRESHOLD, 2),
+    # Multi-view analysis; fields hold the absolute tilt in degrees
+    Rule("measured_shoulder_tilt", "shoulder_tilt", "gt", SHOULDER_TILT_THRESHOLD, 2),
+    Rule("measured_hip_tilt", "hip_tilt", "gt", HIP_TILT_THRESHOLD, 2),
+    Rule("measured_head_tilt", "head_tilt", "gt", HEAD_TILT_THRESHOLD, 1),
+)
+
+# (minimum score, risk level), highest first
+RISK_THRESHOLDS = ((15, "High"), (8, "Moderate"), (0, "Low"))
+
+NUMERIC_OPS = ("ge", "gt", "lt", "range")
+INT_FIELDS = ("age", "height", "weight", "pain_severity", "screen_time", "posture_awareness")
+
+
+def normalize_responses(record):
+    # CSV gives every value as a string; bring records in line with what the app stores
+    responses = dict(record)
+    for field in INT_FIELDS:
+        if responses.get(field) not in (None, ""):
+            responses[field] = int(float(responses[field]))
+    location = responses.get("pain_location")
+    if isinstance(location, str):
+        responses["pain_location"] = [part.strip() for part in location.split(";") if part.strip()]
+    if responses.get("pain_present") != "Yes":
+        # Same defaults the app stores when the pain questions are skipped
+        responses.update(pain_location=[], pain_severity=0, pain_duration="",
+                         symptom_onset="", activity_related_pain="")
+    return responses
+
+
+def _evaluate(column, op, operand):
+    if op in ("eq", "ne", "in"):
+        # A missing answer (None or "") never fires, not even a "ne" rule
+        answered = np.not_equal(column, None) & np.not_equal(column, "")
+        if op == "eq":
+            return answered & (column == operand)
+        if op == "ne":
+            return answered & (column != operand)
+        return answered & np.isin(column, operand)
+    # Every comparison with a missing (NaN) answer is False
+    if op == "ge":
+        return column >= operand
+    if op == "gt":
+        return column > operand
+    if op == "lt":
+        return column < operand
+    if op == "range":
+        low, high = operand
+        return (column >= low) & (column < high)
+    raise ValueError(f"unknown rule operator {op!r}")
+
+
+def _column(columns, field, op, n):
+    values = columns.get(field)
+    if values is None:
+        values = [None] * n
+    if op not in NUMERIC_OPS:
+        return np.asarray(values, dtype=object)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fiu":
+        return values
+    # Missing numeric answers become NaN
+    return np.array([np.nan if v is None or v == "" else v for v in values], dtype=np.float64)
+
+
+def records_to_columns(records):
+    # List of response dicts -> {field: list of values}, touching only fields the rules use
+    fields = {rule.field for rule in RULES} | {rule.when[0] for rule in RULES if rule.when}
+    return {field: [record.get(field) for record in records] for field in fields}
+
+
+def encode(columns, rules=RULES):
+    """Evaluate every rule predicate over a batch of responses.
+
+    ``columns`` maps field names to equal-length sequences (or NumPy arrays)
+    of answers. Returns a float32 (N, R) matrix with 1 where rule R fires.
+    """
+    n = len(next(iter(columns.values()))) if columns else 0
+    matrix = np.zeros((n, len(rules)), dtype=np.float32)
+    cache = {}
+
+    def condition(field, op, operand):
+        key = (field, op, operand)
+        if key not in cache:
+            cache[key] = _evaluate(_column(columns, field, op, n), op, operand)
+        return cache[key]
+
+    for i, rule in enumerate(rules):
+        fired = condition(rule.field, rule.op, rule.operand)
+        if rule.when is not None:
+            fired = fired & condition(*rule.when)
+        matrix[:, i] = fired
+    return matrix
+
+
+def rule_weights(rules=RULES, overrides=None):
+    # Weight vector in rule order, with optional {rule name: weight} overrides
+    overrides = overrides or {}
+    unknown = set(overrides) - {rule.name for rule in rules}
+    if unknown:
+        raise ValueError(f"unknown rules in weight overrides: {sorted(unknown)}")
+    return np.array([overrides.get(rule.name, rule.weight) for rule in rules], dtype=np.float32)
+
+
+def score_matrix(matrix, weights=None):
+    # One matrix-vector product; pass a (R, K) weight matrix to try K weightings at once
+    if weights is None:
+        weights = rule_weights()
+    return matrix @ weights
+
+
+def risk_levels(scores, thresholds=RISK_THRESHOLDS):
+    scores = np.asarray(scores)
+    conditions = [scores >= minimum for minimum, _ in thresholds[:-1]]
+    choices = [level for _, level in thresholds[:-1]]
+    return np.select(conditions, choices, default=thresholds[-1][1])
+
+
+def score_records(records, weights=None):
+    scores = score_matrix(encode(records_to_columns(records)), weights)
+    return scores, risk_levels(scores)
+
+
+def calculate_score(responses, weights=None):
+    # Single assessment through the same engine as bulk scoring
+    scores, _ = score_records([responses], weights)
+    score = float(scores[0])
+    return int(score) if score.is_integer() else score
+
+
+def get_risk_level(score):
+    return str(risk_levels([score])[0])
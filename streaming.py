@@ -0,0 +1,239 @@
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from geometry import METRIC_NAMES, compute_metrics, mask_low_visibility, metrics_dict
+from pose_analysis import landmarks_to_array
+from preview import to_landmark_list
+
+mp_drawing = mp.solutions.drawing_utils
+mp_pose = mp.solutions.pose
+
+# Frames are analyzed at this long edge; tracking mode gains nothing from more
+STREAM_MAX_EDGE = 640
+
+
+class OneEuroFilter:
+    """One-Euro low-pass filter over NumPy arrays with irregular timestamps.
+
+    Slow movements are smoothed hard (jitter goes away) while fast ones pass
+    with little lag. NaN inputs keep the previous estimate.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        x = np.asarray(x, dtype=np.float32)
+        if self._x is None:
+            self._x = np.where(np.isnan(x), 0, x)
+            self._dx = np.zeros_like(self._x)
+            self._t = t
+            return self._x
+        dt = max(t - self._t, 1e-6)
+        self._t = t
+
+        x = np.where(np.isnan(x), self._x, x)
+        a_d = self._alpha(self.d_cutoff, dt)
+        self._dx = a_d * (x - self._x) / dt + (1 - a_d) * self._dx
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+        a = self._alpha(cutoff, dt)
+        self._x = a * x + (1 - a) * self._x
+        return self._x
+
+    def reset(self):
+        self._x = self._dx = self._t = None
+
+
+@dataclass
+class TrackedFrame:
+    # Seconds since the start of the stream (video time for files)
+    timestamp: float
+    # RGB frame at analysis resolution
+    rgb: np.ndarray
+    # Smoothed (33, 4) landmarks, or None when nobody is in view
+    landmarks: Optional[np.ndarray]
+    metrics: Optional[dict]
+    # Frames of the source skipped before this one
+    stride: int
+
+
+class FrameSource:
+    """Reads frames from a webcam index or video file on a background thread.
+
+    Only every ``stride``-th frame is handed over. For live sources the queue
+    holds at most ``maxsize`` frames and the oldest is dropped when it is full,
+    so the consumer always sees the most recent picture. For files nothing is
+    dropped and the reader simply waits.
+    """
+
+    def __init__(self, source, live=None, maxsize=2):
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video source {source!r}")
+        self.live = isinstance(source, int) if live is None else live
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.stride = 1
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="frame-source", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        index = 0
+        try:
+            while not self._stop.is_set():
+                if not self.capture.grab():
+                    break
+                index += 1
+                if index % self.stride:
+                    continue
+                ok, frame = self.capture.retrieve()
+                if not ok:
+                    break
+                if self.live:
+                    timestamp = time.monotonic() - self._started
+                else:
+                    timestamp = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+                # Downscale and convert to RGB once, here, off the consumer's thread
+                height, width = frame.shape[:2]
+                scale = STREAM_MAX_EDGE / max(height, width)
+                if scale < 1:
+                    frame = cv2.resize(frame, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                self._put((timestamp, rgb, self.stride))
+        finally:
+            self._put(None)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                if self.live:
+                    self._queue.put_nowait(item)
+                else:
+                    self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self.live:
+                    # Drop the stale frame rather than fall behind real time
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.capture.release()
+
+
+def draw_tracked(frame):
+    # Overlay the smoothed skeleton on a copy of the frame
+    annotated = frame.rgb.copy()
+    if frame.landmarks is not None:
+        mp_drawing.draw_landmarks(annotated, to_landmark_list(frame.landmarks), mp_pose.POSE_CONNECTIONS)
+    return annotated
+
+
+def track(source, target_fps=10.0, model_complexity=1, live=None, min_cutoff=1.0, beta=0.05):
+    """Yield a TrackedFrame for each analyzed frame of ``source``.
+
+    Pose runs in tracking mode, so after the first detection it follows the
+    person from frame to frame instead of re-detecting. Frame skipping adapts
+    to hold ``target_fps``: for live sources it also backs off when inference
+    cannot keep up; for files it samples the video at ``target_fps``.
+    """
+    frames = FrameSource(source, live=live)
+    frames.stride = max(1, round(frames.fps / target_fps))
+    smoother = OneEuroFilter(min_cutoff, beta)
+    process_time = None
+    try:
+        with mp_pose.Pose(static_image_mode=False, model_complexity=model_complexity,
+                          smooth_landmarks=False, enable_segmentation=False) as pose:
+            while True:
+                item = frames.get()
+                if item is None:
+                    break
+                timestamp, rgb, stride = item
+
+                started = time.perf_counter()
+                results = pose.process(rgb)
+                elapsed = time.perf_counter() - started
+                process_time = elapsed if process_time is None else 0.8 * process_time + 0.2 * elapsed
+
+                # Analyze no more often than the target or than inference allows
+                achievable = 1.0 / process_time if frames.live else float("inf")
+                frames.stride = max(1, round(frames.fps / min(target_fps, achievable)))
+
+                if not results.pose_landmarks:
+                    smoother.reset()
+                    yield TrackedFrame(timestamp, rgb, None, None, stride)
+                    continue
+
+                landmarks = smoother(landmarks_to_array(results.pose_landmarks), timestamp)
+                height, width = rgb.shape[:2]
+                values, confidence = compute_metrics(landmarks, (width, height))
+                metrics = metrics_dict(mask_low_visibility(values, confidence)[0])
+                yield TrackedFrame(timestamp, rgb, landmarks, metrics, stride)
+    finally:
+        frames.close()
+
+
+def per_second(tracked_frames):
+    """Aggregate tracked frames into one summary per second of stream time.
+
+    Yields (summary, frame) pairs, where summary is None except for the first
+    frame of each new second, which carries the mean metrics of the last one.
+    """
+    window = None
+    rows = []
+    for frame in tracked_frames:
+        second = int(frame.timestamp)
+        summary = None
+        if window is not None and second != window:
+            summary = _summarize(window, rows)
+            rows = []
+        window = second
+        if frame.metrics is not None:
+            rows.append([np.nan if frame.metrics[name] is None else frame.metrics[name] for name in METRIC_NAMES])
+        else:
+            rows.append([np.nan] * len(METRIC_NAMES))
+        yield summary, frame
+    if window is not None:
+        yield _summarize(window, rows), None
+
+
+def _summarize(second, rows):
+    values = np.array(rows, dtype=np.float32)
+    detected = ~np.isnan(values).all(axis=1)
+    summary = {"second": second, "frames": len(rows), "detected": int(detected.sum())}
+    with np.errstate(invalid="ignore"):
+        counts = (~np.isnan(values)).sum(axis=0)
+        means = np.nansum(values, axis=0) / np.maximum(counts, 1)
+    for name, count, mean in zip(METRIC_NAMES, counts, means):
+        summary[name] = float(mean) if count else None
+    return summary
@@ -0,0 +1,75 @@
+import csv
+import json
+
+import pytest
+
+import batch
+from assessment_store import AssessmentStore
+
+RESPONSES = [
+    {"id": record_id, "pain_present": "No", "foot_alignment": "Inward", "screen_time": 8}
+    for record_id in ("a", "b", "c")
+]
+
+
+def write_responses(path):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in RESPONSES:
+            f.write(json.dumps(record) + "\n")
+
+
+def output_ids(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if str(path).endswith(".csv"):
+            return [row["id"] for row in csv.DictReader(f)]
+        return [json.loads(line)["id"] for line in f]
+
+
+@pytest.mark.parametrize("name", ["out.csv", "out.jsonl"])
+def test_resume_redoes_a_partial_last_record(tmp_path, name):
+    responses = tmp_path / "responses.jsonl"
+    output = tmp_path / name
+    write_responses(responses)
+    assert batch.run(None, str(responses), str(output), workers=1, include_report=True) == (3, 0)
+
+    # Interrupted in the middle of writing the last record, after its id
+    output.write_bytes(output.read_bytes()[:-20])
+
+    completed, errors = batch.run(None, str(responses), str(output), workers=1, include_report=True)
+    assert (completed, errors) == (1, 0)
+    assert output_ids(output) == ["a", "b", "c"]
+
+
+def test_resume_skips_finished_records(tmp_path):
+    responses = tmp_path / "responses.jsonl"
+    output = tmp_path / "out.csv"
+    write_responses(responses)
+    batch.run(None, str(responses), str(output), workers=1)
+    assert batch.run(None, str(responses), str(output), workers=1) == (0, 0)
+    assert output_ids(output) == ["a", "b", "c"]
+
+
+def test_output_never_gets_ahead_of_the_store(tmp_path, monkeypatch):
+    responses = tmp_path / "responses.jsonl"
+    output = tmp_path / "out.jsonl"
+    store_dir = tmp_path / "store"
+    with open(responses, "w", encoding="utf-8") as f:
+        for i in range(5):
+            f.write(json.dumps({"id": f"r{i}", "pain_present": "No"}) + "\n")
+    monkeypatch.setattr(batch, "STORE_BATCH", 2)
+
+    written = []
+    write = batch.ResultWriter.write
+
+    def checked_write(self, row):
+        # Whatever a resume would skip must already be committed to the store
+        with open(store_dir / "meta.json", encoding="utf-8") as f:
+            stored = json.load(f)["rows"]
+        written.append(row["id"])
+        assert len(written) <= stored
+        write(self, row)
+
+    monkeypatch.setattr(batch.ResultWriter, "write", checked_write)
+    assert batch.run(None, str(responses), str(output), workers=1, store_path=str(store_dir)) == (5, 0)
+    assert len(AssessmentStore(str(store_dir), readonly=True)) == 5
+    assert output_ids(output) == [f"r{i}" for i in range(5)]
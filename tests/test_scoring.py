@@ -0,0 +1,139 @@
+import random
+
+import numpy as np
+
+from scoring import HIP_ANGLE_THRESHOLD, calculate_score, get_risk_level, normalize_responses, score_records
+
+CHOICES = {
+    "gender": ("Male", "Female", "Prefer not to say", "Other"),
+    "occupation": ("Student", "Office Worker", "Manual Labor", "Other"),
+    "pain_present": ("Yes", "No"),
+    "pain_duration": ("Less than a month", "1-6 months", "6 months to a year", "Over a year"),
+    "symptom_onset": ("Gradually", "Suddenly"),
+    "activity_related_pain": ("Yes", "No"),
+    "previous_diagnosis": ("Yes", "No"),
+    "family_history": ("Yes", "No"),
+    "past_injuries": ("Yes", "No"),
+    "physical_activity_level": ("Sedentary", "Lightly active", "Moderately active", "Very active"),
+    "ergonomic_setup": ("Yes", "No"),
+    "sleeping_position": ("Back", "Side", "Stomach", "Other"),
+    "shoulder_alignment": ("Yes", "No"),
+    "head_alignment": ("Yes", "No"),
+    "spinal_curvature": ("Yes", "No"),
+    "hip_level": ("Yes", "No"),
+    "foot_alignment": ("Straight", "Inward", "Outward"),
+    "clothes_fit": ("Yes", "No"),
+    "mobility": ("Yes", "No"),
+    "fatigue": ("Yes", "No"),
+    "breathing": ("Yes", "No"),
+    "balance_issues": ("Yes", "No"),
+}
+
+
+def legacy_score(responses):
+    # The if-chain the rule table replaced, kept as the reference
+    score = 0
+    if responses["pain_present"] == "Yes":
+        score += 2
+        if responses["pain_severity"] >= 7:
+            score += 2
+        elif responses["pain_severity"] >= 4:
+            score += 1
+        if responses["pain_duration"] in ["6 months to a year", "Over a year"]:
+            score += 2
+        if responses["symptom_onset"] == "Suddenly":
+            score += 1
+        if responses["activity_related_pain"] == "Yes":
+            score += 1
+    if responses["previous_diagnosis"] == "Yes":
+        score += 3
+    if responses["family_history"] == "Yes":
+        score += 2
+    if responses["past_injuries"] == "Yes":
+        score += 1
+    if responses["physical_activity_level"] in ["Sedentary", "Lightly active"]:
+        score += 1
+    if responses["screen_time"] > 6:
+        score += 1
+    if responses["posture_awareness"] < 5:
+        score += 1
+    if responses["ergonomic_setup"] == "No":
+        score += 1
+    if responses["sleeping_position"] == "Stomach":
+        score += 1
+    if responses["shoulder_alignment"] == "Yes":
+        score += 2
+    if responses["head_alignment"] == "Yes":
+        score += 2
+    if responses["spinal_curvature"] == "Yes":
+        score += 3
+    if responses["hip_level"] == "No":
+        score += 2
+    if responses["foot_alignment"] != "Straight":
+        score += 1
+    if responses["clothes_fit"] == "Yes":
+        score += 1
+    if responses["mobility"] == "Yes":
+        score += 2
+    if responses["fatigue"] == "Yes":
+        score += 1
+    if responses["breathing"] == "Yes":
+        score += 1
+    if responses["balance_issues"] == "Yes":
+        score += 1
+    hip_angle = responses["hip_angle"]
+    if hip_angle is not None and hip_angle < HIP_ANGLE_THRESHOLD:
+        score += 2
+    return score
+
+
+def legacy_risk_level(score):
+    if score >= 15:
+        return "High"
+    elif 8 <= score < 15:
+        return "Moderate"
+    return "Low"
+
+
+def random_record(rng):
+    record = {field: rng.choice(choices) for field, choices in CHOICES.items()}
+    record.update(
+        age=rng.randint(5, 100),
+        height=rng.randint(50, 250),
+        weight=rng.randint(10, 300),
+        pain_severity=rng.randint(0, 10),
+        screen_time=rng.randint(0, 24),
+        posture_awareness=rng.randint(1, 10),
+        pain_location=["Lower Back"],
+        hip_angle=rng.choice([None, rng.uniform(120, 200)]),
+    )
+    return normalize_responses(record)
+
+
+def test_matches_legacy_if_chain():
+    rng = random.Random(0)
+    records = [random_record(rng) for _ in range(20000)]
+    scores, levels = score_records(records)
+    expected = np.array([legacy_score(record) for record in records])
+    np.testing.assert_array_equal(scores, expected)
+    assert list(levels) == [legacy_risk_level(score) for score in expected]
+
+
+def test_single_assessment_matches_bulk():
+    rng = random.Random(1)
+    for record in (random_record(rng) for _ in range(200)):
+        score = calculate_score(record)
+        assert score == legacy_score(record)
+        assert get_risk_level(score) == legacy_risk_level(score)
+
+
+def test_missing_answers_never_fire():
+    assert calculate_score({}) == 0
+    assert calculate_score({"foot_alignment": ""}) == 0
+    assert calculate_score({"foot_alignment": None, "hip_level": "", "pain_present": None}) == 0
+    assert calculate_score({"foot_alignment": "Inward"}) == 1
+
+
+def test_csv_record_with_empty_cells():
+    record = normalize_responses({"id": "1", "foot_alignment": "", "screen_time": "", "pain_present": "No"})
+    assert calculate_score(record) == 0
@@ -0,0 +1,52 @@
+"""Lazy gateway to the pose-estimation stack.
+
+Importing OpenCV, MediaPipe and TensorFlow Lite takes seconds and a few
+hundred MB per process, so the questionnaire and scoring code must not pay
+for it. The app reaches the vision modules only through this one, which
+imports them on first use. Photos are analyzed by inference_service worker
+processes; POSTURE_WARMUP=1 (the default) starts those workers and their pose
+models on a background thread once the page has rendered.
+"""
+
+import importlib
+import logging
+import os
+import threading
+
+WARM_UP = os.environ.get("POSTURE_WARMUP", "1") not in ("", "0")
+
+logger = logging.getLogger(__name__)
+
+_warm_up_thread = None
+_warm_up_lock = threading.Lock()
+
+
+def streaming():
+    # The import lock makes concurrent first calls safe
+    return importlib.import_module("streaming")
+
+
+def warm_up():
+    """Start the inference workers, which load one estimator per default tier."""
+    from inference_service import get_service
+
+    for future in get_service().start():
+        future.result()
+
+
+def _run_warm_up():
+    try:
+        warm_up()
+    except Exception:
+        # e.g. a model that cannot be downloaded; the first request will report it
+        logger.warning("Vision warm-up failed", exc_info=True)
+
+
+def start_warm_up():
+    # Idempotent, so it can be called at the end of every script run
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_run_warm_up, name="vision-warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread